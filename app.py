@@ -3,47 +3,134 @@ from dotenv import load_dotenv
 import gradio as gr
 from gradio.themes import Soft
 from src.notion import NotionAgent
+from src.frontend.utils import format_response, strip_decorations, format_index_status
+from src.notion.indexer import IndexingWorker
+from src.notion.changes import ChangeQueue, ChangeFeedWorker, SearchPoller, start_webhook_server
+from src.frontend.session import ChatSession
+from src.utils.logging import configure_logging, get_logger, metrics, start_metrics_server
+import threading
 import time
 
 load_dotenv()
+configure_logging()
+logger = get_logger("src.app")
 
 class NotionAgentUI:
     def __init__(self):
-        self.agent = NotionAgent()
-        self.chat_history = []
+        # O agente é compartilhado; histórico e parâmetros ficam na sessão de cada usuário
+        # O índice persistido atende consultas de imediato; a sincronização roda em segundo plano
+        self.agent = NotionAgent(sync_on_start=False)
+        self.indexer = IndexingWorker(self.agent, interval=float(os.getenv("SYNC_INTERVAL", 900)),
+                                      prune=os.getenv("SYNC_PRUNE", "false").lower() == "true").start()
+        # Atualizações ao vivo: webhooks do Notion e/ou consulta periódica da busca
+        webhook_port = os.getenv("WEBHOOK_PORT")
+        poll_interval = float(os.getenv("CHANGE_POLL_INTERVAL", 0))
+        if webhook_port or poll_interval > 0:
+            self.changes = ChangeQueue(debounce=float(os.getenv("CHANGE_DEBOUNCE", 2)))
+            ChangeFeedWorker(self.agent, self.changes).start()
+            if webhook_port:
+                start_webhook_server(self.changes, int(webhook_port), host=os.getenv("WEBHOOK_HOST"),
+                                     secret=os.getenv("NOTION_WEBHOOK_SECRET"))
+            if poll_interval > 0:
+                SearchPoller(self.agent.api_client, self.changes, self.agent.sync.manifest,
+                             interval=poll_interval).start()
 
-    def _respond(self, message: str, temp: float, max_len: int):
+        # Métricas no formato do Prometheus em GET /metrics (desligado sem METRICS_PORT)
+        if os.getenv("METRICS_PORT"):
+            start_metrics_server(int(os.getenv("METRICS_PORT")))
+
+    def _respond(self, message: str, temp: float, max_len: int, session: ChatSession):
+        session.temperature = temp
+        session.max_tokens = max_len
+        history = session.history
         try:
-            self.agent.llm.temperature = temp
-            
             # Mensagem de processamento
-            self.chat_history.append((message, "⌛ Processando..."))
-            yield "", self.chat_history, gr.update(interactive=False)
+            history.append((message, "⌛ Processando..."))
+            yield "", history, gr.update(interactive=False), session
             
             start_time = time.time()
-            response = self.agent.respond(message, self.chat_history)
+            cached = self.agent.cached_answer(message, history[:-1])
+            if cached:
+                elapsed = time.time() - start_time
+                metrics.inc("answers_total", mode="stream", cached="true")
+                hit_rate = self.agent.cache.stats()["hit_rate"]
+                history[-1] = (message, format_response(cached.answer, elapsed, cache_hit_rate=hit_rate))
+                yield "", history, gr.update(interactive=True), session
+                return
+
+            # Histórico limpo e limitado: janela recente + resumo das trocas antigas
+            with session.lock:
+                summary, summarized = session.summary, session.summarized_turns
+            window = self.agent.memory.window(strip_decorations(history[:-1]), summarized)
+
+            first_token = None
+            response = ""
+            for token in self.agent.stream_respond(message, window,
+                                                   temperature=session.temperature,
+                                                   max_tokens=session.max_tokens,
+                                                   summary=summary):
+                if first_token is None:
+                    first_token = time.time() - start_time
+                response += token
+                history[-1] = (message, response)
+                yield "", history, gr.update(interactive=False), session
             elapsed = time.time() - start_time
             
-            # Garante que a resposta não é None
-            if response is None:
+            # Garante que a resposta não é vazia
+            if not response:
                 response = "Não foi possível gerar uma resposta."
                 
-            formatted_response = f"{response}\n\n⏱️ {elapsed:.2f}s"
-            self.chat_history[-1] = (message, formatted_response)
+            history[-1] = (message, format_response(response, elapsed, first_token))
             
-            yield "", self.chat_history, gr.update(interactive=True)
+            yield "", history, gr.update(interactive=True), session
+            self._compact_memory(session)
             
         except Exception as e:
             error_msg = f"⚠️ Erro: {str(e)}"
-            if not self.chat_history:
-                self.chat_history.append((message, error_msg))
+            if not history:
+                history.append((message, error_msg))
             else:
-                self.chat_history[-1] = (message, error_msg)
-            yield "", self.chat_history, gr.update(interactive=True)
+                history[-1] = (message, error_msg)
+            yield "", history, gr.update(interactive=True), session
+
+    def _compact_memory(self, session: ChatSession):
+        """Atualiza o resumo da conversa em segundo plano, fora do caminho da resposta"""
+        history = session.history
+        turns = strip_decorations(history)
+        with session.lock:
+            if session.compacting or not self.agent.memory.needs_compaction(turns, session.summarized_turns):
+                return
+            session.compacting = True
+            summary, summarized = session.summary, session.summarized_turns
 
-    def _clear_chat(self):
-        self.chat_history = []
-        return None, self.chat_history, gr.update(value="", placeholder="Digite sua pergunta...")
+        def run():
+            try:
+                result = self.agent.memory.compact(turns, summary, summarized)
+                with session.lock:
+                    # A conversa pode ter sido limpa enquanto o LLM resumia
+                    if session.history is history:
+                        session.summary, session.summarized_turns = result
+            except Exception:
+                logger.exception("Falha ao resumir o histórico da conversa")
+            finally:
+                with session.lock:
+                    session.compacting = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _clear_chat(self, session: ChatSession):
+        with session.lock:
+            session.history = []
+            session.summary = ""
+            session.summarized_turns = 0
+        return None, session.history, gr.update(value="", placeholder="Digite sua pergunta..."), session
+
+    def _index_status(self):
+        return format_index_status(self.indexer.status())
+
+    def _sync_now(self):
+        self.indexer.trigger()
+        return self._index_status()
 
     def launch(self):
         custom_theme = Soft(
@@ -67,6 +154,9 @@ class NotionAgentUI:
             }
             """) as demo:
             
+            # Estado isolado por usuário (histórico e parâmetros de geração)
+            session = gr.State(ChatSession())
+            
             # Header
             gr.HTML("""
             <div style="text-align: center; margin-bottom: 20px;">
@@ -108,12 +198,8 @@ class NotionAgentUI:
                 max_length = gr.Slider(100, 2000, value=800, step=100, label="Comprimento Máximo")
                 
                 gr.Markdown("### Documentos Carregados")
-                gr.HTML("""
-                <div style='border: 1px solid #e0e0e0; padding: 15px; border-radius: 8px;'>
-                    <p>📄 <strong>Documentos carregados:</strong> 1</p>
-                    <p>🔄 <strong>Última atualização:</strong> Hoje</p>
-                </div>
-                """)
+                index_status = gr.HTML(self._index_status())
+                sync_btn = gr.Button("🔄 Sincronizar agora", variant="secondary", size="sm")
             
             # Exemplos
             gr.Examples(
@@ -130,19 +216,26 @@ class NotionAgentUI:
             # Eventos
             msg.submit(
                 self._respond,
-                [msg, temperature, max_length],
-                [msg, chatbot, msg]
+                [msg, temperature, max_length, session],
+                [msg, chatbot, msg, session]
             )
             submit_btn.click(
                 self._respond,
-                [msg, temperature, max_length],
-                [msg, chatbot, msg]
+                [msg, temperature, max_length, session],
+                [msg, chatbot, msg, session]
             )
             clear_btn.click(
                 self._clear_chat,
-                outputs=[msg, chatbot, msg]
+                inputs=[session],
+                outputs=[msg, chatbot, msg, session]
             )
+            sync_btn.click(self._sync_now, outputs=index_status)
+            demo.load(self._index_status, outputs=index_status)
+            if hasattr(gr, "Timer"):
+                gr.Timer(5).tick(self._index_status, outputs=index_status)
         
+        # Permite várias conversas em paralelo no mesmo processo
+        demo.queue(default_concurrency_limit=int(os.getenv("CONCURRENCY_LIMIT", 16)))
         demo.launch(share=False, server_name=os.getenv("SERVER_NAME_IP"), server_port=os.getenv("SERVER_PORT"))
 
 if __name__ == "__main__":
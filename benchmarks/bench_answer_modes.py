@@ -0,0 +1,73 @@
+"""Compara a latência dos modos de resposta do NotionAgent
+
+- chain: ConversationalRetrievalChain (reformula a pergunta com o LLM e depois responde)
+- single: reformulação heurística e uma única chamada ao LLM
+
+Lê um JSONL com {"question": ..., "history": [[pergunta, resposta], ...]} ou usa
+um conjunto embutido de perguntas de acompanhamento. Requer o índice em
+database/chroma e GOOGLE_API_KEY.
+
+Uso: python -m benchmarks.bench_answer_modes [conversas.jsonl] [--repeat 2]
+"""
+import argparse
+import json
+import statistics
+import time
+from dotenv import load_dotenv
+
+SAMPLES = [
+    {"history": [["Quais documentos são necessários para alugar um imóvel?",
+                  "RG, CPF, comprovante de renda e comprovante de residência."]],
+     "question": "E para imóvel comercial?"},
+    {"history": [["Qual é o prazo padrão de um contrato de locação?", "30 meses."]],
+     "question": "Dá para rescindir antes disso?"},
+    {"history": [["Como funciona o processo de vistoria?",
+                  "A vistoria é feita na entrada e na saída do inquilino."]],
+     "question": "Quem paga por ela?"},
+    {"history": [], "question": "Quais garantias locatícias são aceitas?"},
+]
+
+
+def llm_calls(snapshot) -> int:
+    return int(sum(stats["count"] for stats in snapshot.get("llm_seconds", {}).values()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("conversations", nargs="?")
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--modes", nargs="+", default=["chain", "single"])
+    args = parser.parse_args()
+    load_dotenv()
+
+    from src.notion.agent import NotionAgent
+    from src.utils.logging import metrics
+
+    samples = SAMPLES
+    if args.conversations:
+        with open(args.conversations, encoding="utf-8") as f:
+            samples = [json.loads(line) for line in f if line.strip()]
+
+    agent = NotionAgent(sync_on_start=False)
+    print(f"{len(samples)} perguntas x {args.repeat} repetições")
+    print(f"{'modo':<8} {'média s':>8} {'p50 s':>7} {'p95 s':>7} {'LLM/resp':>9}")
+    for mode in args.modes:
+        agent.answer_mode = mode
+        latencies = []
+        calls_before = llm_calls(metrics.snapshot())
+        for _ in range(args.repeat):
+            for sample in samples:
+                agent.cache.clear()
+                history = [tuple(turn) for turn in sample.get("history", [])]
+                start = time.perf_counter()
+                agent.respond(sample["question"], history)
+                latencies.append(time.perf_counter() - start)
+        calls = llm_calls(metrics.snapshot()) - calls_before
+        latencies.sort()
+        print(f"{mode:<8} {statistics.mean(latencies):>8.2f} {latencies[len(latencies) // 2]:>7.2f} "
+              f"{latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:>7.2f} "
+              f"{calls / len(latencies):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
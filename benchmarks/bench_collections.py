@@ -0,0 +1,75 @@
+"""Benchmark de latência de consulta em função do tamanho da coleção
+
+Cria coleções do Chroma com vetores aleatórios (sem modelo de embeddings) em
+um diretório temporário e mede p50/p95 das buscas e recall@k contra a busca
+exata, para cada tamanho e cada `ef_search`. Mostra o ganho de separar um
+workspace grande em coleções menores.
+
+Uso: python -m benchmarks.bench_collections [--sizes 1000 10000 50000] [--ef-search 10 50 100] [--m 16]
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from src.chroma.collections import HNSWParams
+from src.chroma.retriever import ChromaRetriever
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def fill(collection, vectors: np.ndarray, batch_size: int = 5000) -> float:
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), batch_size):
+        batch = vectors[offset:offset + batch_size]
+        collection.add(ids=[str(offset + i) for i in range(len(batch))], embeddings=batch.tolist())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    print(f"{'vetores':>8} {'ef_search':>9} {'p50 ms':>8} {'p95 ms':>8} {f'recall@{args.k}':>9} {'carga s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        chroma = ChromaRetriever(persist_directory=directory)
+        for size in args.sizes:
+            vectors = rng.standard_normal((size, args.dim), dtype=np.float32)
+            # Vizinhos exatos (l2) para o recall: |q|² - 2q·v + |v|²
+            distances = (queries ** 2).sum(axis=1)[:, None] - 2 * queries @ vectors.T + (vectors ** 2).sum(axis=1)
+            expected = np.argsort(distances, axis=1)[:, :args.k]
+
+            for ef_search in args.ef_search:
+                # ef_search é fixado na criação no Chroma: uma coleção por combinação
+                params = HNSWParams(m=args.m, ef_construction=args.ef_construction, ef_search=ef_search)
+                name = f"bench-{size}-{ef_search}"
+                collection = chroma.client.create_collection(name, metadata=params.to_metadata())
+                load_time = fill(collection, vectors)
+
+                latencies, found = [], []
+                for query in queries:
+                    start = time.perf_counter()
+                    result = collection.query(query_embeddings=[query.tolist()], n_results=args.k)
+                    latencies.append(time.perf_counter() - start)
+                    found.append([int(i) for i in result["ids"][0]])
+
+                recall = np.mean([len(set(e) & set(f)) / args.k for e, f in zip(expected, found)])
+                print(f"{size:>8} {ef_search:>9} {percentile(latencies, 0.5) * 1000:>8.2f} "
+                      f"{percentile(latencies, 0.95) * 1000:>8.2f} {recall:>9.3f} {load_time:>8.1f}")
+                chroma.drop_collection(name)
+
+
+if __name__ == "__main__":
+    main()
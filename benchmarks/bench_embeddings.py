@@ -0,0 +1,103 @@
+"""Benchmark dos backends de embeddings em CPU sobre o corpus indexado
+
+Compara torch fp32 (baseline), ONNX fp32 e ONNX int8 em vazão de indexação
+(textos/s), latência de uma consulta (p50/p95) e recall@k contra os vizinhos
+do baseline. Também mede o efeito de guardar os vetores do baseline em
+float16/int8. Usa os chunks de database/chroma (ou um arquivo de textos).
+
+Uso: python -m benchmarks.bench_embeddings [--texts corpus.txt] [--limit 2000] [--threads 4] [--k 4 10]
+"""
+import argparse
+import random
+import time
+import numpy as np
+from src.utils.embeddings import EmbeddingService, encode_vector, decode_vector
+
+
+def load_corpus(path: str, limit: int):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        from src.chroma.retriever import ChromaRetriever
+        texts = ChromaRetriever().load().get(include=["documents"])["documents"]
+    return texts[:limit]
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True).clip(min=1e-9)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True).clip(min=1e-9)
+    return np.argsort(-queries @ corpus.T, axis=1)[:, :k]
+
+
+def recall_at_k(expected: np.ndarray, found: np.ndarray) -> float:
+    k = expected.shape[1]
+    return float(np.mean([len(set(e) & set(f)) / k for e, f in zip(expected, found)]))
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_backend(backend: str, texts, queries, batch_size: int, threads: int):
+    service = EmbeddingService(batch_size=batch_size, cache_path=None, backend=backend, threads=threads)
+    service.embed_documents(texts[:batch_size])  # carrega/exporta o modelo fora da medição
+
+    start = time.perf_counter()
+    corpus = np.array(service.embed_documents(texts), dtype=np.float32)
+    throughput = len(texts) / (time.perf_counter() - start)
+
+    latencies, query_vectors = [], []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(service.embed_query(query))
+        latencies.append(time.perf_counter() - start)
+    return corpus, np.array(query_vectors, dtype=np.float32), throughput, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", help="Arquivo com um texto por linha (padrão: chunks do Chroma)")
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--k", type=int, nargs="+", default=[4, 10])
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    args = parser.parse_args()
+
+    texts = load_corpus(args.texts, args.limit)
+    # Consultas curtas derivadas do próprio corpus: o início de chunks sorteados
+    random.seed(0)
+    queries = [" ".join(text.split()[:12]) for text in random.sample(texts, min(args.queries, len(texts)))]
+    print(f"{len(texts)} textos, {len(queries)} consultas, threads={args.threads or 'padrão'}")
+
+    header = f"{'backend':<18} {'textos/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'bytes/vet':>9}"
+    print(header + "".join(f" {'recall@' + str(k):>9}" for k in args.k))
+
+    baseline = None
+    for backend in args.backends:
+        corpus, query_vectors, throughput, latencies = run_backend(
+            backend, texts, queries, args.batch_size, args.threads
+        )
+        if baseline is None:
+            baseline = (corpus, query_vectors)
+            expected = {k: top_k(corpus, query_vectors, k) for k in args.k}
+        recalls = [recall_at_k(expected[k], top_k(corpus, query_vectors, k)) for k in args.k]
+        print(f"{backend:<18} {throughput:>9.1f} {percentile(latencies, 0.5) * 1000:>7.1f} "
+              f"{percentile(latencies, 0.95) * 1000:>7.1f} {len(encode_vector(corpus[0].tolist())):>9}"
+              + "".join(f" {r:>9.3f}" for r in recalls))
+
+    # Armazenamento compacto dos vetores do baseline (consultas em fp32)
+    corpus, query_vectors = baseline
+    for dtype in ("float16", "int8"):
+        stored = np.array([decode_vector(encode_vector(v.tolist(), dtype), dtype) for v in corpus], dtype=np.float32)
+        recalls = [recall_at_k(expected[k], top_k(stored, query_vectors, k)) for k in args.k]
+        size = len(encode_vector(corpus[0].tolist(), dtype))
+        print(f"{args.backends[0] + '/' + dtype:<18} {'-':>9} {'-':>7} {'-':>7} {size:>9}"
+              + "".join(f" {r:>9.3f}" for r in recalls))
+
+
+if __name__ == "__main__":
+    main()
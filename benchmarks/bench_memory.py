@@ -0,0 +1,70 @@
+"""Latência por troca: histórico completo vs. janela com resumo
+
+Simula um LLM cuja latência cresce com o tamanho do prompt (condensação da
+pergunta) para mostrar que, com `SummaryWindowMemory`, o custo por troca fica
+estável em conversas longas.
+
+Uso: python -m benchmarks.bench_memory [--turns 50] [--max-tokens 800]
+"""
+import argparse
+import time
+from src.utils.memory import SummaryWindowMemory
+from src.utils.text_processor import estimate_tokens
+
+
+class SimulatedLLM:
+    """LLM fake: latência fixa + custo proporcional aos tokens do prompt"""
+
+    def __init__(self, base: float = 0.002, per_token: float = 0.00002):
+        self.base = base
+        self.per_token = per_token
+
+    def invoke(self, prompt: str):
+        time.sleep(self.base + self.per_token * estimate_tokens(prompt))
+        return type("Message", (), {"content": prompt[-400:]})()
+
+
+def condense_prompt(history, summary, question) -> str:
+    turns = SummaryWindowMemory.with_summary(history, summary)
+    text = "\n".join(f"Usuário: {q}\nAssistente: {a}" for q, a in turns)
+    return f"{text}\nPergunta: {question}"
+
+
+def run(memory: SummaryWindowMemory, llm: SimulatedLLM, turns: int):
+    history, summary, summarized = [], "", 0
+    answer = " ".join(["resposta"] * 120)
+    rows = []
+    for turn in range(1, turns + 1):
+        question = f"Pergunta número {turn} sobre o contrato de locação?"
+        start = time.perf_counter()
+        prompt = condense_prompt(memory.window(history, summarized), summary, question)
+        llm.invoke(prompt)
+        elapsed = time.perf_counter() - start
+        history.append((question, answer))
+        # No app o resumo é atualizado em segundo plano, depois da resposta
+        start = time.perf_counter()
+        summary, summarized = memory.compact(history, summary, summarized)
+        rows.append((turn, estimate_tokens(prompt), elapsed, time.perf_counter() - start))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--max-tokens", type=int, default=800)
+    args = parser.parse_args()
+
+    llm = SimulatedLLM()
+    buffer_rows = run(SummaryWindowMemory(llm, max_tokens=0), llm, args.turns)
+    window_rows = run(SummaryWindowMemory(llm, max_tokens=args.max_tokens), llm, args.turns)
+
+    print(f"{'troca':>5} | {'buffer tokens':>13} {'ms':>7} | {'janela tokens':>13} {'ms':>7} {'resumo ms':>9}")
+    for (turn, b_tokens, b_time, _), (_, w_tokens, w_time, w_compact) in zip(buffer_rows, window_rows):
+        if turn == 1 or turn % 5 == 0:
+            print(f"{turn:>5} | {b_tokens:>13} {b_time * 1000:>7.1f} | {w_tokens:>13} {w_time * 1000:>7.1f} "
+                  f"{w_compact * 1000:>9.1f}")
+    summaries = sum(1 for row in window_rows if row[3] > 0.001)
+    print(f"\nResumos gerados: {summaries} em {args.turns} trocas")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark offline do NotionAPIClient contra o FakeNotionServer
+
+Uso: python -m benchmarks.bench_notion_client [--workers 8] [--latency 0.02]
+"""
+import argparse
+import time
+from src.notion.api_client import NotionAPIClient
+from src.notion.block_parser import NotionBlockParser
+from src.notion.concurrent_fetcher import ConcurrentFetcher
+from src.notion.fake_server import FakeNotionServer, build_tree, make_paragraph
+from src.notion.recursive_fetcher import RecursiveFetcher
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+
+    tree = build_tree("root", args.width, args.depth)
+    # Bloco com mais de 100 filhos para validar a paginação
+    tree["root"].append(make_paragraph("wide", "Bloco largo", has_children=True))
+    tree["wide"] = [make_paragraph(f"wide-{i}", f"Item {i}") for i in range(250)]
+
+    with FakeNotionServer(tree, latency=args.latency, fail_every=args.fail_every) as server:
+        client = NotionAPIClient("token", "2022-06-28", base_url=server.base_url,
+                                 pool_size=args.workers, backoff_base=0.01)
+        block_parser = NotionBlockParser()
+
+        assert len(client.get_block_children("wide")) == 250, "paginação incompleta"
+
+        results = {}
+        for name, fetcher in [
+            ("serial", RecursiveFetcher(client, block_parser, delay=0)),
+            ("concurrent", ConcurrentFetcher(client, block_parser, max_workers=args.workers)),
+        ]:
+            before = server.request_count
+            start = time.perf_counter()
+            results[name] = fetcher.fetch_page("root")
+            elapsed = time.perf_counter() - start
+            requests = server.request_count - before
+            print(f"{name:<12} {requests:>5} reqs  {elapsed:7.2f}s  {requests / elapsed:8.1f} req/s")
+
+        assert results["serial"] == results["concurrent"], "saídas divergentes"
+        print("OK: saídas idênticas")
+
+
+if __name__ == "__main__":
+    main()
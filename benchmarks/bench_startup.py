@@ -0,0 +1,108 @@
+"""Benchmark de inicialização de main.py e app.py
+
+Registra o custo de import (`python -X importtime`) e o tempo até a primeira
+requisição: para main.py, até a primeira chamada ao Notion (servida pelo
+FakeNotionServer); para app.py, até a porta do Gradio responder.
+Os resultados são anexados em JSON Lines para acompanhar regressões.
+
+Uso: python -m benchmarks.bench_startup [--output benchmarks/startup.jsonl] [--skip-app]
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from src.notion.fake_server import FakeNotionServer, build_tree
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(module: str, top: int = 10):
+    """Tempo total de import e os módulos mais caros (cumulativo, em ms)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append((match.group(4), int(match.group(2)) / 1000, len(match.group(3))))
+    total = sum(cumulative for _, cumulative, indent in entries if indent == 1)
+    slowest = sorted(entries, key=lambda entry: entry[1], reverse=True)[:top]
+    return total, [(name, round(ms, 1)) for name, ms, _ in slowest], result.returncode
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main_first_request(timeout: float = 120) -> float:
+    """Tempo entre iniciar main.py e a primeira requisição ao Notion"""
+    with FakeNotionServer(build_tree("root", 3, 2)) as server:
+        env = dict(os.environ, NOTION_API_URL=server.base_url, NOTION_PAGE_ID="root",
+                   NOTION_TOKEN="token", NOTION_VERSION="2022-06-28")
+        start = time.time()
+        process = subprocess.Popen([sys.executable, "main.py"], env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while server.first_request_at is None and time.time() - start < timeout:
+                if process.poll() is not None:
+                    break
+                time.sleep(0.01)
+        finally:
+            process.kill()
+        return server.first_request_at - start if server.first_request_at else float("nan")
+
+
+def app_first_request(timeout: float = 300) -> float:
+    """Tempo entre iniciar app.py e a primeira resposta HTTP do Gradio"""
+    port = free_port()
+    env = dict(os.environ, SERVER_NAME_IP="127.0.0.1", SERVER_PORT=str(port), SYNC_INTERVAL="0")
+    start = time.time()
+    process = subprocess.Popen([sys.executable, "app.py"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.time() - start < timeout and process.poll() is None:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1)
+                return time.time() - start
+            except OSError:
+                time.sleep(0.1)
+    finally:
+        process.kill()
+    return float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default="benchmarks/startup.jsonl")
+    parser.add_argument("--skip-app", action="store_true")
+    args = parser.parse_args()
+
+    record = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    for module in ["main", "app"]:
+        total, slowest, returncode = import_profile(module)
+        record[f"{module}_import_ms"] = round(total, 1)
+        record[f"{module}_slowest_imports"] = slowest
+        status = "" if returncode == 0 else " (falhou)"
+        print(f"import {module}: {total:.0f} ms{status}")
+        for name, ms in slowest[:5]:
+            print(f"    {ms:>8.1f} ms  {name}")
+
+    record["main_first_request_s"] = round(main_first_request(), 3)
+    print(f"main.py até a 1ª requisição: {record['main_first_request_s']:.2f}s")
+    if not args.skip_app:
+        record["app_first_request_s"] = round(app_first_request(), 3)
+        print(f"app.py até a 1ª resposta: {record['app_first_request_s']:.2f}s")
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Avaliação offline de relevância e latência dos modos de busca
+
+Lê um arquivo JSONL com {"question": ..., "relevant": [trechos ou block_ids]}
+e mede recall@k, MRR e latência para cada combinação de modo, k e fetch_k,
+usando os chunks já persistidos em database/chroma.
+
+Uso: python -m benchmarks.eval_retrieval perguntas.jsonl --k 4 8 --fetch-k 20 40 [--rerank]
+"""
+import argparse
+import json
+import statistics
+import time
+from src.chroma.hybrid import BM25Index
+from src.chroma.retriever import ChromaRetriever
+from src.notion.batch import is_relevant
+
+
+def evaluate(retriever, samples, k: int):
+    hits, reciprocal_ranks, latencies = 0, [], []
+    for sample in samples:
+        start = time.perf_counter()
+        documents = retriever.invoke(sample["question"])[:k]
+        latencies.append(time.perf_counter() - start)
+        rank = next((i + 1 for i, doc in enumerate(documents) if is_relevant(doc, sample["relevant"])), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    latencies.sort()
+    return {
+        "recall": hits / len(samples),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+
+def retriever_kind(retriever) -> str:
+    """Tipo efetivo do retriever, para garantir que cada modo mede algo diferente"""
+    rerank = "+rerank" if getattr(retriever, "reranker", None) is not None else ""
+    return f"{type(retriever).__name__}{rerank}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("questions")
+    parser.add_argument("--k", type=int, nargs="+", default=[4])
+    parser.add_argument("--fetch-k", type=int, nargs="+", default=[20])
+    parser.add_argument("--rerank", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.questions, encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+
+    chroma = ChromaRetriever()
+    vectorstore = chroma.load()
+    keyword_index = BM25Index()
+    keyword_index.load_from_vectorstore(vectorstore)
+
+    modes = [("vector", False), ("hybrid", False)]
+    if args.rerank:
+        modes += [("vector", True), ("hybrid", True)]
+
+    kinds = {retriever_kind(chroma.as_retriever(vectorstore, mode=mode, rerank=rerank, keyword_index=keyword_index))
+             for mode, rerank in modes}
+    if len(kinds) != len(modes):
+        raise SystemExit(f"Os modos avaliados não produzem retrievers distintos: {sorted(kinds)}")
+
+    print(f"{len(samples)} perguntas, {len(keyword_index)} chunks")
+    print(f"{'modo':<16} {'k':>3} {'fetch_k':>7} {'recall':>7} {'mrr':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode, rerank in modes:
+        for k in args.k:
+            for fetch_k in args.fetch_k:
+                retriever = chroma.as_retriever(vectorstore, mode=mode, k=k, fetch_k=fetch_k,
+                                                rerank=rerank, keyword_index=keyword_index)
+                result = evaluate(retriever, samples, k)
+                name = f"{mode}{'+rerank' if rerank else ''}"
+                print(f"{name:<16} {k:>3} {fetch_k:>7} {result['recall']:>7.2f} {result['mrr']:>6.2f} "
+                      f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
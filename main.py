@@ -1,20 +1,70 @@
 from dotenv import load_dotenv
+import argparse
 import os
-from src.notion import NotionAPIClient, RecursiveFetcher, NotionBlockParser
-from src.chroma import ChromaRetriever
+from src.notion import NotionAPIClient, ConcurrentFetcher, NotionBlockParser, TokenBucketRateLimiter
+from src.utils.logging import configure_logging
+from src.notion.block_cache import BlockCache, DEFAULT_BLOCK_CACHE_PATH
+from src.notion.pipeline import IngestionPipeline
+from src.notion.sync import IncrementalSync, SyncManifest
+from src.notion.workspace import WorkspaceIngestor, parse_roots
 
-load_dotenv()
+def main():
+    load_dotenv()
+    configure_logging()
 
-# Configuração
-notion = NotionAPIClient(os.getenv("NOTION_TOKEN"), os.getenv("NOTION_VERSION"))
-parser = NotionBlockParser()
-fetcher = RecursiveFetcher(notion, parser)
+    parser = argparse.ArgumentParser(description="Indexa páginas do Notion no ChromaDB")
+    parser.add_argument("page_ids", nargs="*", help="Páginas raiz (padrão: NOTION_PAGE_ID/DEFAULT_PAGE_ID)")
+    parser.add_argument("--all", action="store_true", help="Indexa todas as páginas compartilhadas com a integração")
+    parser.add_argument("--max-depth", type=int, default=int(os.getenv("WORKSPACE_MAX_DEPTH", 3)),
+                        help="Níveis de subpáginas a percorrer")
+    parser.add_argument("--offline", action="store_true",
+                        help="Reindexa a partir do cache de blocos em disco, sem acessar o Notion")
+    parser.add_argument("--force", action="store_true",
+                        help="Reprocessa também páginas inalteradas (ex.: após mudar o parser ou o chunker)")
+    parser.add_argument("--collection", default=os.getenv("CHROMA_COLLECTION"),
+                        help="Coleção do Chroma (uma por workspace/equipe; padrão: CHROMA_COLLECTION)")
+    args = parser.parse_args()
 
-# Busca conteúdo
-page_id = os.getenv("NOTION_PAGE_ID")
-content = fetcher.fetch_page(page_id)
+    # Configuração
+    notion = NotionAPIClient(os.getenv("NOTION_TOKEN"), os.getenv("NOTION_VERSION"),
+                             rate_limiter=TokenBucketRateLimiter(rate=3.0),
+                             cache=BlockCache(os.getenv("NOTION_BLOCK_CACHE", DEFAULT_BLOCK_CACHE_PATH)),
+                             offline=args.offline)
+    block_parser = NotionBlockParser()
+    fetcher = ConcurrentFetcher(notion, block_parser, max_workers=int(os.getenv("NOTION_MAX_WORKERS", 8)))
+    ingestor = WorkspaceIngestor(notion, fetcher, max_depth=args.max_depth)
 
-# Indexação
-retriever = ChromaRetriever()
-db = retriever.create_from_texts([content])
-print("Conteúdo indexado com sucesso!")
\ No newline at end of file
+    if args.all:
+        roots = ingestor.discover_roots()
+    else:
+        roots = args.page_ids or parse_roots(os.getenv("NOTION_PAGE_ID") or os.getenv("DEFAULT_PAGE_ID"))
+
+    # Importados só aqui: importar main.py não carrega Chroma nem LangChain
+    from src.chroma import ChromaRetriever
+    from src.chroma.collections import manifest_path
+    from src.utils.embeddings import get_embedding_service
+
+    # Indexação incremental em pipeline: busca, parse, chunks, embeddings e gravação em paralelo
+    embeddings = get_embedding_service()
+    chroma = ChromaRetriever(collection_name=args.collection)
+    db = chroma.load(embeddings)
+    sync = IncrementalSync(notion, fetcher, db, manifest=SyncManifest(manifest_path(chroma.collection_name)))
+    pipeline = IngestionPipeline(sync, ingestor, embeddings, queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", 4)))
+    pages = skipped = upserted = deleted = 0
+    for result in pipeline.run(roots, prune=args.all, force=args.force):
+        pages += 1
+        skipped += result.skipped and result.error is None
+        upserted += len(result.upserted)
+        deleted += len(result.deleted)
+
+    print(f"Conteúdo indexado com sucesso na coleção {chroma.collection_name}! {pages} páginas ({skipped} sem alterações), "
+          f"{upserted} trechos atualizados, {deleted} removidos.")
+    if pipeline.failures:
+        print(f"Atenção: {len(pipeline.failures)} páginas/bancos não puderam ser buscados; "
+              f"os dados anteriores foram mantidos e nenhuma página foi removida.")
+    print(f"Vazão por estágio:\n{pipeline.report()}")
+    print(f"Cache de blocos: {notion.cache_hits} hits, {notion.cache_misses} misses")
+    print(f"Cache de embeddings: {embeddings.stats()}")
+
+if __name__ == "__main__":
+    main()
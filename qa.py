@@ -0,0 +1,53 @@
+from dotenv import load_dotenv
+import argparse
+import os
+from src.utils.logging import configure_logging
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Responde um arquivo de perguntas em lote e mede o desempenho")
+    parser.add_argument("questions", help="JSONL ({\"question\", \"relevant\"?, \"history\"?}) ou uma pergunta por linha")
+    parser.add_argument("--concurrency", type=int, default=4, help="Perguntas respondidas em paralelo")
+    parser.add_argument("--repeat", type=int, default=1, help="Repete o arquivo N vezes (exercita o cache)")
+    parser.add_argument("--embed-batch-size", type=int, default=64)
+    parser.add_argument("--mode", choices=["chain", "single"], help="Modo de resposta (padrão: ANSWER_MODE)")
+    parser.add_argument("--fake-llm", action="store_true", help="Usa o LLM local determinístico, sem Gemini")
+    parser.add_argument("--output", help="Grava o resultado de cada pergunta em JSONL")
+    args = parser.parse_args()
+
+    # Precisam estar definidas antes de criar o agente
+    if args.fake_llm:
+        os.environ["LLM_PROVIDER"] = "fake"
+    if args.mode:
+        os.environ["ANSWER_MODE"] = args.mode
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    configure_logging()
+
+    from src.notion.agent import NotionAgent
+    from src.notion.batch import BatchRunner, load_questions
+
+    samples = load_questions(args.questions) * args.repeat
+    agent = NotionAgent(sync_on_start=False)
+    runner = BatchRunner(agent, concurrency=args.concurrency, embed_batch_size=args.embed_batch_size)
+    report = runner.run(samples)
+    summary = report.summary()
+
+    print(f"{summary['questions']} perguntas ({summary['errors']} erros), concorrência {args.concurrency}, "
+          f"modo {agent.answer_mode}")
+    print(f"Vazão: {summary['throughput_qps']:.2f} perguntas/s")
+    print(f"Latência: média {summary['latency_mean']:.3f}s · p50 {summary['latency_p50']:.3f}s · "
+          f"p95 {summary['latency_p95']:.3f}s · p99 {summary['latency_p99']:.3f}s")
+    print(f"Embeddings das perguntas em lote: {summary['query_embedding_seconds']:.2f}s")
+    print(f"Cache de respostas: {summary['answer_cache_hit_rate']:.0%} · "
+          f"cache de embeddings: {summary['embedding_cache_hit_rate']:.0%}")
+    print(f"Single-flight: {summary['llm_calls_saved']} chamadas ao LLM e "
+          f"{summary['query_embeddings_saved']} embeddings de consulta compartilhados")
+    if summary["retrieval_hit_rate"] is not None:
+        print(f"Acerto da busca (trecho relevante recuperado): {summary['retrieval_hit_rate']:.0%}")
+
+    if args.output:
+        runner.write_results(report, args.output)
+
+if __name__ == "__main__":
+    main()
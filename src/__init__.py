@@ -1,10 +1,21 @@
 """
 Módulo principal do Notion Helper
 
-Exporta os componentes principais para uso externo:
+Exporta os componentes principais para uso externo. Os imports são feitos sob
+demanda para que scripts leves (sync, health check) não carreguem a pilha de ML.
 """
-from .notion import NotionAPIClient, RecursiveFetcher  # Exemplo
-from .chroma import ChromaRetriever
+import importlib
 
 __version__ = "0.1.0"
-__all__ = ['NotionAPIClient', 'RecursiveFetcher', 'ChromaRetriever']  # Controla o que é importado com `from src import *`
\ No newline at end of file
+__all__ = ['NotionAPIClient', 'RecursiveFetcher', 'ChromaRetriever']  # Controla o que é importado com `from src import *`
+
+_LAZY_ATTRS = {
+    'NotionAPIClient': '.notion',
+    'RecursiveFetcher': '.notion',
+    'ChromaRetriever': '.chroma',
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        return getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,10 @@
-from .retriever import ChromaRetriever
+import importlib
 
 __all__ = ['ChromaRetriever']
-DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
\ No newline at end of file
+
+def __getattr__(name):
+    if name == 'ChromaRetriever':
+        return importlib.import_module('.retriever', __name__).ChromaRetriever
+    if name == 'DEFAULT_MODEL':
+        return importlib.import_module('src.utils.embeddings').DEFAULT_MODEL
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,143 @@
+"""Coleções nomeadas do Chroma, uma por workspace/página raiz
+
+Uso: python -m src.chroma.collections list|stats|create|compact|drop [nome] [--m 16 --ef-construction 100 --ef-search 10]
+"""
+import argparse
+import os
+import re
+import threading
+from dataclasses import dataclass, replace
+from typing import Dict, Any, Optional
+
+# Nome usado pelo langchain quando nenhuma coleção é informada (índice existente)
+DEFAULT_COLLECTION = "langchain"
+COLLECTION_NAME_PATTERN = re.compile(r"[^a-zA-Z0-9._-]+")
+
+
+@dataclass
+class HNSWParams:
+    """Parâmetros do índice HNSW de uma coleção
+
+    `m` e `ef_construction` só valem na criação (ou num `compact`, que
+    reconstrói a coleção); `ef_search` define a qualidade/latência das buscas.
+    """
+    space: str = "l2"
+    m: int = 16
+    ef_construction: int = 100
+    ef_search: int = 10
+
+    def to_metadata(self) -> Dict[str, Any]:
+        return {
+            "hnsw:space": self.space,
+            "hnsw:M": self.m,
+            "hnsw:construction_ef": self.ef_construction,
+            "hnsw:search_ef": self.ef_search,
+        }
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[Dict[str, Any]]) -> "HNSWParams":
+        metadata = metadata or {}
+        defaults = cls()
+        return cls(
+            space=metadata.get("hnsw:space", defaults.space),
+            m=int(metadata.get("hnsw:M", defaults.m)),
+            ef_construction=int(metadata.get("hnsw:construction_ef", defaults.ef_construction)),
+            ef_search=int(metadata.get("hnsw:search_ef", defaults.ef_search)),
+        )
+
+    @classmethod
+    def from_env(cls) -> "HNSWParams":
+        """CHROMA_HNSW_SPACE, CHROMA_HNSW_M, CHROMA_HNSW_EF_CONSTRUCTION, CHROMA_HNSW_EF_SEARCH"""
+        defaults = cls()
+        return cls(
+            space=os.getenv("CHROMA_HNSW_SPACE", defaults.space),
+            m=int(os.getenv("CHROMA_HNSW_M", defaults.m)),
+            ef_construction=int(os.getenv("CHROMA_HNSW_EF_CONSTRUCTION", defaults.ef_construction)),
+            ef_search=int(os.getenv("CHROMA_HNSW_EF_SEARCH", defaults.ef_search)),
+        )
+
+
+def collection_name(workspace: str) -> str:
+    """Nome de coleção válido para o Chroma (3-63 caracteres [a-zA-Z0-9._-])"""
+    name = COLLECTION_NAME_PATTERN.sub("-", workspace.strip()).strip("-._")[:63]
+    return name if len(name) >= 3 else f"ws-{name}".ljust(3, "0")
+
+
+def manifest_path(collection: str) -> str:
+    """Manifesto de sincronização da coleção (o padrão mantém o caminho original)"""
+    from src.notion.sync import DEFAULT_MANIFEST_PATH
+    if collection == DEFAULT_COLLECTION:
+        return DEFAULT_MANIFEST_PATH
+    return os.path.join(os.path.dirname(DEFAULT_MANIFEST_PATH), "manifests", f"{collection}.json")
+
+
+class CollectionRouter:
+    """Direciona consultas para a coleção pedida, abrindo cada uma sob demanda"""
+
+    def __init__(self, chroma, embeddings=None, **retriever_kwargs):
+        self.chroma = chroma
+        self.embeddings = embeddings
+        self.retriever_kwargs = retriever_kwargs
+        self._retrievers: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def retriever(self, collection: str):
+        with self._lock:
+            if collection not in self._retrievers:
+                if collection not in self.chroma.list_collections():
+                    raise KeyError(f"Coleção inexistente: {collection}")
+                vectorstore = self.chroma.load(self.embeddings, collection_name=collection)
+                self._retrievers[collection] = self.chroma.as_retriever(vectorstore, **self.retriever_kwargs)
+            return self._retrievers[collection]
+
+    def forget(self, collection: str) -> None:
+        """Descarta o retriever em cache (após drop/compact)"""
+        with self._lock:
+            self._retrievers.pop(collection, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerencia as coleções do Chroma")
+    parser.add_argument("command", choices=["list", "stats", "create", "compact", "drop"])
+    parser.add_argument("name", nargs="?")
+    parser.add_argument("--space")
+    parser.add_argument("--m", type=int)
+    parser.add_argument("--ef-construction", type=int)
+    parser.add_argument("--ef-search", type=int)
+    args = parser.parse_args()
+
+    from .retriever import ChromaRetriever
+    chroma = ChromaRetriever()
+
+    if args.command == "list":
+        for name in chroma.list_collections():
+            stats = chroma.collection_stats(name)
+            print(f"{name:<40} {stats['count']:>8} vetores  {stats['hnsw']}")
+        return
+    if not args.name:
+        parser.error("informe o nome da coleção")
+
+    # create parte do .env; compact parte dos parâmetros atuais da coleção
+    params = None
+    if args.command in ("create", "compact"):
+        overrides = {"space": args.space, "m": args.m, "ef_construction": args.ef_construction,
+                     "ef_search": args.ef_search}
+        base = HNSWParams.from_env() if args.command == "create" else \
+            HNSWParams(**chroma.collection_stats(args.name)["hnsw"])
+        params = replace(base, **{k: v for k, v in overrides.items() if v is not None})
+
+    if args.command == "create":
+        chroma.create_collection(args.name, params)
+        print(chroma.collection_stats(args.name))
+    elif args.command == "stats":
+        print(chroma.collection_stats(args.name))
+    elif args.command == "compact":
+        print(chroma.compact_collection(args.name, params))
+        print("Reinicie os processos que usam esta coleção (ex.: app.py) para abrir o índice reconstruído")
+    elif args.command == "drop":
+        chroma.drop_collection(args.name)
+        print(f"Coleção {args.name} removida")
+
+
+if __name__ == "__main__":
+    main()
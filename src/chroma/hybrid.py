@@ -0,0 +1,172 @@
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from src.utils.logging import timed
+
+TOKEN_PATTERN = re.compile(r"\w+")
+DEFAULT_RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens minúsculos e sem acento, preservando códigos como 'RG-12' em partes"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_PATTERN.findall(text)
+
+
+def document_key(document: Document) -> str:
+    """Chave estável do chunk, igual ao id do vetor gerado pela sincronização"""
+    metadata = document.metadata or {}
+    if "block_id" in metadata and "chunk_index" in metadata:
+        return f"{metadata['block_id']}:{metadata['chunk_index']}"
+    return getattr(document, "id", None) or document.page_content
+
+
+class BM25Index:
+    """Índice invertido BM25 em memória sobre os mesmos chunks do Chroma"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._documents: Dict[str, Document] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self.delete([doc_id])
+            tokens = tokenize(text)
+            for term, count in Counter(tokens).items():
+                self._postings[term][doc_id] = count
+            self._lengths[doc_id] = len(tokens)
+            self._total_length += len(tokens)
+            self._documents[doc_id] = Document(page_content=text, metadata=metadata or {})
+
+    def add_texts(self, texts: Iterable[str], metadatas: Iterable[Dict[str, Any]], ids: Iterable[str]) -> None:
+        for text, metadata, doc_id in zip(texts, metadatas, ids):
+            self.add(doc_id, text, metadata)
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for doc_id in ids:
+                document = self._documents.pop(doc_id, None)
+                if document is None:
+                    continue
+                for term in set(tokenize(document.page_content)):
+                    postings = self._postings.get(term)
+                    if postings:
+                        postings.pop(doc_id, None)
+                        if not postings:
+                            del self._postings[term]
+                self._total_length -= self._lengths.pop(doc_id)
+
+    def load_from_vectorstore(self, vectorstore) -> None:
+        """Reconstrói o índice a partir dos chunks já persistidos no Chroma"""
+        data = vectorstore.get(include=["documents", "metadatas"])
+        self.add_texts(data["documents"], data["metadatas"], data["ids"])
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[Document, float]]:
+        with self._lock:
+            n_docs = len(self._documents)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = 1 - self.b + self.b * self._lengths[doc_id] / avg_length
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [(self._documents[doc_id], score) for doc_id, score in ranked]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60) -> List[Document]:
+    """Combina listas ranqueadas somando 1 / (k + posição)"""
+    scores: Dict[str, float] = defaultdict(float)
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking):
+            key = document_key(document)
+            scores[key] += 1.0 / (k + rank + 1)
+            documents.setdefault(key, document)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class CrossEncoderReranker:
+    """Reranqueamento opcional em CPU com um cross-encoder multilíngue"""
+
+    def __init__(self, model_name: str = DEFAULT_RERANK_MODEL, device: str = "cpu"):
+        self.model_name = model_name
+        self.device = device
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name, device=self.device)
+        return self._model
+
+    def rerank(self, query: str, documents: List[Document], top_n: int) -> List[Document]:
+        if not documents:
+            return []
+        scores = self.model.predict([(query, doc.page_content) for doc in documents])
+        ranked = sorted(zip(documents, scores), key=lambda item: item[1], reverse=True)
+        return [doc for doc, _ in ranked[:top_n]]
+
+
+class HybridRetriever(BaseRetriever):
+    """BM25 + vetores fundidos por RRF, com reranqueamento opcional"""
+
+    vectorstore: Any
+    keyword_index: BM25Index
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    reranker: Optional[CrossEncoderReranker] = None
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        with timed("chroma_query_seconds"):
+            vector_docs = self.vectorstore.similarity_search(query, k=self.fetch_k)
+        with timed("bm25_query_seconds"):
+            keyword_docs = [doc for doc, _ in self.keyword_index.search(query, k=self.fetch_k)]
+        fused = reciprocal_rank_fusion([vector_docs, keyword_docs], k=self.rrf_k)
+        if self.reranker is not None:
+            with timed("rerank_seconds"):
+                return self.reranker.rerank(query, fused[:self.fetch_k], self.k)
+        return fused[:self.k]
+
+
+class VectorRetriever(BaseRetriever):
+    """Busca só por vetores, com reranqueamento opcional dos `fetch_k` candidatos"""
+
+    vectorstore: Any
+    k: int = 4
+    fetch_k: int = 20
+    reranker: Optional[CrossEncoderReranker] = None
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        fetch_k = self.fetch_k if self.reranker is not None else self.k
+        with timed("chroma_query_seconds"):
+            documents = self.vectorstore.similarity_search(query, k=fetch_k)
+        if self.reranker is not None:
+            with timed("rerank_seconds"):
+                return self.reranker.rerank(query, documents, self.k)
+        return documents
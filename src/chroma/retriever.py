@@ -1,21 +1,147 @@
-from typing import List
+import os
+import uuid
+from dataclasses import asdict
+from typing import List, Optional, Dict, Any
 from langchain_core.documents import Document
 from langchain.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from src.utils.embeddings import EmbeddingService, get_embedding_service
+from .collections import DEFAULT_COLLECTION, HNSWParams, manifest_path
+from .hybrid import BM25Index, CrossEncoderReranker, HybridRetriever, VectorRetriever
+
+PERSIST_DIRECTORY = "database/chroma"
 
 class ChromaRetriever:
-    def __init__(self, embedding_model: str = None):
-        self.embedding_model = embedding_model or "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-    
-    def create_from_texts(self, texts: List[str]) -> Chroma:
+    def __init__(self, embedding_model: str = None, persist_directory: str = PERSIST_DIRECTORY,
+                 embedding_backend: Optional[str] = None, collection_name: Optional[str] = None,
+                 hnsw: Optional[HNSWParams] = None):
+        self.embedding_model = embedding_model
+        self.persist_directory = persist_directory
+        # 'torch' (padrão), 'onnx' ou 'onnx-int8'; None usa EMBEDDINGS_BACKEND
+        self.embedding_backend = embedding_backend
+        self.collection_name = collection_name or os.getenv("CHROMA_COLLECTION", DEFAULT_COLLECTION)
+        # Usados apenas quando a coleção ainda não existe
+        self.hnsw = hnsw or HNSWParams.from_env()
+        self._client = None
+
+    @property
+    def client(self):
+        """Cliente do Chroma compartilhado por todas as coleções do diretório"""
+        if self._client is None:
+            import chromadb
+            self._client = chromadb.PersistentClient(path=self.persist_directory)
+        return self._client
+
+    def _create_embeddings(self) -> EmbeddingService:
+        return get_embedding_service(self.embedding_model, self.embedding_backend)
+
+    def create_from_texts(self, texts: List[str], collection_name: Optional[str] = None) -> Chroma:
         """Cria vetorstore a partir de textos"""
-        embeddings = HuggingFaceEmbeddings(
-            model_name=self.embedding_model,
-            model_kwargs={'device': 'cpu'}
-        )
-        
         return Chroma.from_texts(
             texts=texts,
-            embedding=embeddings,
-            persist_directory="database/chroma"
-        )
\ No newline at end of file
+            embedding=self._create_embeddings(),
+            client=self.client,
+            collection_name=collection_name or self.collection_name,
+            collection_metadata=self.hnsw.to_metadata()
+        )
+
+    def load(self, embeddings=None, collection_name: Optional[str] = None) -> Chroma:
+        """Abre o vetorstore persistido sem reindexar"""
+        return Chroma(
+            embedding_function=embeddings or self._create_embeddings(),
+            client=self.client,
+            collection_name=collection_name or self.collection_name,
+            collection_metadata=self.hnsw.to_metadata()
+        )
+
+    def create_collection(self, name: str, params: Optional[HNSWParams] = None, embeddings=None) -> Chroma:
+        """Cria (ou abre) uma coleção com os parâmetros HNSW informados"""
+        return Chroma(
+            embedding_function=embeddings or self._create_embeddings(),
+            client=self.client,
+            collection_name=name,
+            collection_metadata=(params or self.hnsw).to_metadata()
+        )
+
+    def list_collections(self) -> List[str]:
+        # chromadb < 0.6 devolve objetos Collection; as versões novas, apenas os nomes
+        return sorted(getattr(c, "name", c) for c in self.client.list_collections())
+
+    def collection_stats(self, name: str) -> Dict[str, Any]:
+        collection = self.client.get_collection(name)
+        return {
+            "name": name,
+            "count": collection.count(),
+            "hnsw": asdict(HNSWParams.from_metadata(collection.metadata)),
+        }
+
+    def drop_collection(self, name: str) -> None:
+        """Apaga a coleção e o manifesto de sincronização dela
+
+        Sem o manifesto, uma coleção recriada com o mesmo nome é reindexada do
+        zero (com ele, todas as páginas seriam dadas como inalteradas). O índice
+        BM25 não tem arquivo próprio: é reconstruído a partir da coleção.
+        """
+        self.client.delete_collection(name)
+        path = manifest_path(name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def compact_collection(self, name: str, params: Optional[HNSWParams] = None,
+                           batch_size: int = 500) -> Dict[str, Any]:
+        """Reconstrói o índice HNSW da coleção copiando os vetores já calculados
+
+        Remove os nós marcados como apagados pelas sincronizações e permite
+        alterar `m`/`ef_construction`, que o Chroma fixa na criação. Nenhum
+        embedding é recalculado.
+
+        A coleção original só é apagada depois que a cópia assume o nome: se o
+        processo cair no meio, os dados continuam em `<nome>-bak-*`. A coleção
+        reconstruída tem outro id, então processos que a mantêm aberta (ex.:
+        app.py) precisam ser reiniciados ou reabri-la (`CollectionRouter.forget`).
+        """
+        source = self.client.get_collection(name)
+        params = params or HNSWParams.from_metadata(source.metadata)
+        metadata = {k: v for k, v in (source.metadata or {}).items() if not k.startswith("hnsw:")}
+        metadata.update(params.to_metadata())
+
+        suffix = uuid.uuid4().hex[:8]
+        target = self.client.create_collection(f"{name[:50]}-tmp-{suffix}", metadata=metadata)
+        offset = 0
+        while True:
+            batch = source.get(include=["embeddings", "documents", "metadatas"],
+                               limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            target.add(ids=batch["ids"], embeddings=batch["embeddings"],
+                       documents=batch["documents"], metadatas=batch["metadatas"])
+            offset += len(batch["ids"])
+
+        # Troca de nomes antes de apagar: em nenhum momento a única cópia fica sem nome recuperável
+        backup = f"{name[:50]}-bak-{suffix}"
+        source.modify(name=backup)
+        target.modify(name=name)
+        self.client.delete_collection(backup)
+        return self.collection_stats(name)
+
+    def as_retriever(self, vectorstore: Chroma, mode: str = "vector", k: int = 4, fetch_k: int = 20,
+                     rerank: bool = False, keyword_index: Optional[BM25Index] = None):
+        """Cria o retriever no modo desejado: 'vector' (padrão) ou 'hybrid' (BM25 + vetores)
+
+        O modo decide o retriever: `keyword_index` só é usado no modo 'hybrid'.
+        """
+        if mode not in ("vector", "hybrid"):
+            raise ValueError(f"Modo de busca desconhecido: {mode}")
+        if mode == "vector":
+            return VectorRetriever(vectorstore=vectorstore, k=k, fetch_k=fetch_k,
+                                   reranker=CrossEncoderReranker() if rerank else None)
+
+        if keyword_index is None:
+            keyword_index = BM25Index()
+            keyword_index.load_from_vectorstore(vectorstore)
+        return HybridRetriever(
+            vectorstore=vectorstore,
+            keyword_index=keyword_index,
+            k=k,
+            fetch_k=fetch_k,
+            reranker=CrossEncoderReranker() if rerank else None
+        )
@@ -0,0 +1,21 @@
+import threading
+from dataclasses import dataclass, field, fields
+from typing import List, Tuple
+
+@dataclass
+class ChatSession:
+    """Estado de uma conversa, mantido por usuário via `gr.State`"""
+    history: List[Tuple[str, str]] = field(default_factory=list)
+    temperature: float = 0.3
+    max_tokens: int = 800
+    # Resumo incremental das trocas que saíram da janela de memória
+    summary: str = ""
+    summarized_turns: int = 0
+    # Protege o resumo, atualizado por uma thread após cada resposta
+    compacting: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __deepcopy__(self, memo):
+        # `gr.State` copia o valor inicial por usuário; o lock não é copiável
+        return ChatSession(**{f.name: list(getattr(self, f.name)) if f.name == "history" else getattr(self, f.name)
+                              for f in fields(self) if f.name not in ("lock", "compacting")})
@@ -1,12 +1,47 @@
-from typing import List, Tuple
+import re
+from typing import List, Tuple, Optional, Dict, Any
 
-def format_response(response: str, elapsed: float) -> str:
+DECORATION_PATTERN = re.compile(r"\n\n(?:⏱️|⚡) [^\n]*$")
+
+def format_response(response: str, elapsed: float, first_token: Optional[float] = None,
+                    cache_hit_rate: Optional[float] = None) -> str:
     """Formata a resposta do bot com metadata"""
-    return f"{response}\n\n⏱️ {elapsed:.2f}s"
+    if cache_hit_rate is not None:
+        return f"{response}\n\n⚡ Resposta em cache · {elapsed:.2f}s · taxa de acerto {cache_hit_rate:.0%}"
+    if first_token is None:
+        return f"{response}\n\n⏱️ {elapsed:.2f}s"
+    return f"{response}\n\n⏱️ 1º token {first_token:.2f}s · total {elapsed:.2f}s"
 
 def handle_error(chat_history: List[Tuple], message: str, error: Exception) -> List[Tuple]:
     """Trata erros de forma consistente"""
     error_msg = f"⚠️ Erro: {str(error)}"
     if not chat_history:
         return [(message, error_msg)]
-    return chat_history[:-1] + [(message, error_msg)]
\ No newline at end of file
+    return chat_history[:-1] + [(message, error_msg)]
+
+def strip_decorations(chat_history: List[Tuple]) -> List[Tuple[str, str]]:
+    """Remove marcações exclusivas da UI (tempo, cache, erros) antes de enviar à cadeia"""
+    turns = []
+    for message, response in chat_history:
+        if not response or response.startswith(("⌛", "⚠️")):
+            continue
+        turns.append((message, DECORATION_PATTERN.sub("", response)))
+    return turns
+
+
+def format_index_status(status: Dict[str, Any]) -> str:
+    """Painel HTML com o estado da indexação"""
+    last_sync = status["last_sync"].strftime("%d/%m/%Y %H:%M") if status["last_sync"] else "Nunca"
+    if status["state"] == "sincronizando":
+        state = f"⏳ Sincronizando ({status['progress']:.0%})"
+    elif status["state"] == "erro":
+        state = f"⚠️ Erro: {status['error']}"
+    else:
+        state = "✅ Atualizado"
+    return f"""
+    <div style='border: 1px solid #e0e0e0; padding: 15px; border-radius: 8px;'>
+        <p>📄 <strong>Documentos carregados:</strong> {status['documents']} ({status['chunks']} trechos)</p>
+        <p>🔄 <strong>Última atualização:</strong> {last_sync}</p>
+        <p>{state}</p>
+    </div>
+    """
@@ -1,13 +1,20 @@
-from src.utils.llm import load_embeddings, load_llm
-from .agent import NotionAgent
-from .api_client import NotionAPIClient
-from .block_parser import NotionBlockParser
-from .recursive_fetcher import RecursiveFetcher
+import importlib
 
-__all__ = ['NotionAgent', 'NotionAPIClient', 'NotionBlockParser', 'RecursiveFetcher']
+__all__ = ['NotionAgent', 'NotionAPIClient', 'NotionBlockParser', 'RecursiveFetcher',
+           'ConcurrentFetcher', 'TokenBucketRateLimiter', 'NotionFetchError']
 
-def __init__(self):
-    self.llm = load_llm()
-    self.embeddings = load_embeddings()
-    self._initialize_vectorstore()
-    self._initialize_qa_chain()  # Garante que a cadeia existe
+# Importados sob demanda: NotionAgent puxa LangChain, Chroma e o modelo de embeddings
+_LAZY_ATTRS = {
+    'NotionAgent': '.agent',
+    'NotionAPIClient': '.api_client',
+    'NotionFetchError': '.api_client',
+    'NotionBlockParser': '.block_parser',
+    'RecursiveFetcher': '.recursive_fetcher',
+    'ConcurrentFetcher': '.concurrent_fetcher',
+    'TokenBucketRateLimiter': '.rate_limiter',
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        return getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,62 +1,297 @@
 # src/notion/agent.py
 import os
-from typing import List
-from src.utils.llm import load_llm
+import threading
+import time
+from typing import List, Dict, Any, Iterator, Optional, Iterable
+from src.utils.llm import load_llm, coalesce_embeddings, LLMMetricsCallback, CONDENSE_TAG
+from src.utils.logging import get_logger, metrics, timed
 from .api_client import NotionAPIClient
+from .block_cache import BlockCache, DEFAULT_BLOCK_CACHE_PATH
 from .block_parser import NotionBlockParser
 from .recursive_fetcher import RecursiveFetcher
-from langchain.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from .sync import IncrementalSync, SyncManifest
+from .workspace import WorkspaceIngestor, parse_roots
+from src.chroma.retriever import ChromaRetriever
+from src.chroma.collections import CollectionRouter, manifest_path
+from src.chroma.hybrid import BM25Index, reciprocal_rank_fusion
+from src.utils.embeddings import get_embedding_service
+from src.utils.cache import SemanticCache, CachedAnswer
+from src.utils.memory import SummaryWindowMemory
+from src.utils.query import rewrite_query, fit_to_budget
+from .sync import SyncResult
+
+logger = get_logger(__name__)
+
+STREAM_PROMPT = """Use os trechos de documentos abaixo para responder à pergunta do usuário.
+Se a resposta não estiver nos documentos, diga que não sabe.
+
+Documentos:
+{context}
+
+Conversa anterior:
+{history}
+
+Pergunta: {question}
+Resposta:"""
 
 class NotionAgent:
-    def __init__(self):
+    def __init__(self, sync_on_start: bool = True):
         self.llm = load_llm() 
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-        )
-        self.api_client = NotionAPIClient(os.getenv("NOTION_TOKEN"), os.getenv("NOTION_VERSION"))
+        # Perguntas iguais feitas ao mesmo tempo compartilham o embedding da consulta
+        self.embeddings = coalesce_embeddings(get_embedding_service())
+        # Cache de blocos brutos: re-sincronizações só buscam subárvores editadas
+        self.api_client = NotionAPIClient(os.getenv("NOTION_TOKEN"), os.getenv("NOTION_VERSION"),
+                                          cache=BlockCache(os.getenv("NOTION_BLOCK_CACHE", DEFAULT_BLOCK_CACHE_PATH)))
         self.parser = NotionBlockParser()
         self.fetcher = RecursiveFetcher(self.api_client, self.parser)
+        self.workspace = WorkspaceIngestor(self.api_client, self.fetcher,
+                                           max_depth=int(os.getenv("WORKSPACE_MAX_DEPTH", 3)))
         
-        # Carrega conteúdo
-        content = self.fetcher.fetch_page(os.getenv("DEFAULT_PAGE_ID"))
-        
-        # Configura ChromaDB
-        self.vectorstore = Chroma.from_texts(
-            texts=[content],
-            embedding=self.embeddings,
-            persist_directory="database/chroma"
+        # Abre a coleção do workspace (CHROMA_COLLECTION); a sincronização envia apenas o que mudou
+        self.chroma = ChromaRetriever()
+        self.collection = self.chroma.collection_name
+        self.vectorstore = self.chroma.load(self.embeddings)
+
+        # Busca vetorial ou híbrida (BM25 + vetores), com reranqueamento opcional
+        retrieval_mode = os.getenv("RETRIEVAL_MODE", "vector")
+        self.keyword_index = BM25Index()
+        if retrieval_mode == "hybrid":
+            self.keyword_index.load_from_vectorstore(self.vectorstore)
+        retriever_kwargs = dict(
+            mode=retrieval_mode,
+            k=int(os.getenv("RETRIEVAL_K", 4)),
+            fetch_k=int(os.getenv("RETRIEVAL_FETCH_K", 20)),
+            rerank=os.getenv("RETRIEVAL_RERANK", "false").lower() == "true",
         )
+        self.retriever = self.chroma.as_retriever(self.vectorstore, keyword_index=self.keyword_index,
+                                                  **retriever_kwargs)
+        # Consultas direcionadas a outras coleções (somente leitura) abrem cada uma sob demanda
+        self.router = CollectionRouter(self.chroma, self.embeddings, **retriever_kwargs)
+        self.sync = IncrementalSync(self.api_client, self.fetcher, self.vectorstore,
+                                    manifest=SyncManifest(manifest_path(self.collection)),
+                                    keyword_index=self.keyword_index if retrieval_mode == "hybrid" else None)
+        # Sincronizações periódicas e por evento não gravam o índice ao mesmo tempo
+        self._sync_lock = threading.RLock()
+
+        # Cache de respostas para perguntas repetidas (exata + similaridade)
+        self.cache = SemanticCache(
+            self.embeddings,
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92)),
+            max_size=int(os.getenv("ANSWER_CACHE_SIZE", 256)),
+            ttl=float(os.getenv("ANSWER_CACHE_TTL", 3600))
+        )
+
+        # 'chain': ConversationalRetrievalChain (reformula a pergunta com o LLM);
+        # 'single': reformulação heurística e uma única chamada ao LLM
+        self.answer_mode = os.getenv("ANSWER_MODE", "chain")
+        if self.answer_mode not in ("chain", "single"):
+            raise ValueError(f"Modo de resposta desconhecido: {self.answer_mode}")
+        # Orçamento de tokens dos trechos enviados no prompt (0 = sem limite)
+        self.context_max_tokens = int(os.getenv("CONTEXT_MAX_TOKENS", 1500))
+
+        # Janela de histórico limitada por tokens (0 = histórico completo)
+        self.memory = SummaryWindowMemory(self.llm, max_tokens=int(os.getenv("MEMORY_MAX_TOKENS", 800)))
+
+        # Com sync_on_start=False a sincronização fica a cargo do IndexingWorker
+        if sync_on_start:
+            for _ in self.sync_workspace():
+                pass
+
+    def roots(self) -> List[str]:
+        """Páginas raiz: DEFAULT_PAGE_ID (aceita vários ids separados por vírgula) ou a busca do Notion"""
+        return parse_roots(os.getenv("DEFAULT_PAGE_ID")) or self.workspace.discover_roots()
+
+    def sync_page(self, page_id: str) -> SyncResult:
+        """Sincroniza uma página e invalida as respostas em cache que dependem dela"""
+        with self._sync_lock:
+            result = self.sync.sync_page(page_id)
+        if result.upserted or result.deleted:
+            self.cache.invalidate([page_id])
+        return result
+
+    def remove_page(self, page_id: str) -> SyncResult:
+        """Remove uma página do índice (ex.: apagada no Notion)"""
+        with self._sync_lock:
+            result = self.sync.remove_page(page_id)
+        self.cache.invalidate([page_id])
+        return result
+
+    def sync_workspace(self, roots: Optional[Iterable[str]] = None,
+                       prune: bool = False) -> Iterator[SyncResult]:
+        """Sincroniza o workspace a partir das raízes, invalidando o cache das páginas alteradas
+
+        Como no `main.py`, páginas fora das raízes só são removidas com `prune`.
+        """
+        with self._sync_lock:
+            for result in self.sync.sync_workspace(self.workspace, roots or self.roots(), prune=prune):
+                if result.upserted or result.deleted:
+                    self.cache.invalidate([result.page_id])
+                yield result
+
+    def document_count(self) -> int:
+        """Quantidade de páginas e chunks indexados"""
+        return len(self.sync.manifest.pages)
+
+    def chunk_count(self) -> int:
+        return self.vectorstore._collection.count()
+
+    def cached_answer(self, question: str, history: List) -> Optional[CachedAnswer]:
+        """Busca no cache; só perguntas sem histórico são cacheáveis"""
+        if history or not question.strip():
+            return None
+        return self.cache.get(question)
+
+    @staticmethod
+    def _page_ids(documents) -> List[str]:
+        return [doc.metadata["page_id"] for doc in documents if doc.metadata.get("page_id")]
     
-    def respond(self, question: str, history: List) -> str:
+    def _session_llm(self, temperature: Optional[float] = None, max_tokens: Optional[int] = None):
+        """Cópia do LLM com os parâmetros da sessão, sem alterar a instância compartilhada"""
+        update = {}
+        if temperature is not None:
+            update["temperature"] = temperature
+        if max_tokens is not None:
+            update["max_output_tokens"] = int(max_tokens)
+        return self.llm.model_copy(update=update) if update else self.llm
+
+    def _retriever_for(self, collection: Optional[str] = None):
+        """Retriever da coleção pedida (None ou a coleção do agente usa o principal)"""
+        if collection is None or collection == self.collection:
+            return self.retriever
+        return self.router.retriever(collection)
+
+    def retrieve(self, question: str, history: List, collection: Optional[str] = None) -> List:
+        """Recupera o contexto sem chamar o LLM
+
+        Perguntas que dependem do histórico também são buscadas junto com as
+        últimas perguntas do usuário, e as duas listas são fundidas por RRF.
+        O resultado respeita o orçamento `context_max_tokens`.
+        """
+        retriever = self._retriever_for(collection)
+        with timed("retrieval_seconds"):
+            documents = retriever.invoke(question)
+            query = rewrite_query(question, history)
+            if query:
+                metrics.inc("query_rewrites_total")
+                documents = reciprocal_rank_fusion([retriever.invoke(query), documents])
+        return fit_to_budget(documents, self.context_max_tokens)
+
+    def _build_prompt(self, question: str, documents: List, history: List, summary: str = "") -> str:
+        return STREAM_PROMPT.format(
+            context="\n\n".join(doc.page_content for doc in documents),
+            history="\n".join(f"Usuário: {q}\nAssistente: {a}"
+                               for q, a in self.memory.with_summary(history, summary)),
+            question=question
+        )
+
+    def respond(self, question: str, history: List,
+                temperature: Optional[float] = None, max_tokens: Optional[int] = None,
+                summary: str = "", collection: Optional[str] = None) -> str:
+        return self.respond_with_sources(question, history, temperature, max_tokens, summary, collection)["answer"]
+
+    def respond_with_sources(self, question: str, history: List,
+                             temperature: Optional[float] = None, max_tokens: Optional[int] = None,
+                             summary: str = "", collection: Optional[str] = None) -> Dict[str, Any]:
+        """Responde e retorna também os trechos usados: {"answer", "documents", "cached"}
+
+        `collection` direciona a busca para outra coleção; o cache de respostas
+        só é usado na coleção do agente, cujas páginas ele sabe invalidar.
+        """
+        result: Dict[str, Any] = {"answer": "", "documents": [], "cached": False}
         try:
             if not question.strip():
-                return "Por favor, faça uma pergunta válida."
-            
-            # Garante que a cadeia QA está inicializada
-            if not hasattr(self, 'qa_chain'):
-                self._initialize_qa_chain()
-                
-            result = self.qa_chain({"question": question, "chat_history": history})
-            return result.get("answer", "Não foi possível gerar uma resposta.")
+                result["answer"] = "Por favor, faça uma pergunta válida."
+                return result
+
+            own_collection = collection is None or collection == self.collection
+            cached = self.cached_answer(question, history) if own_collection else None
+            if cached:
+                metrics.inc("answers_total", mode=self.answer_mode, cached="true")
+                result.update(answer=cached.answer, cached=True)
+                return result
+
+            llm = self._session_llm(temperature, max_tokens)
+            callback = LLMMetricsCallback()
+            with timed("answer_seconds", mode=self.answer_mode) as timer:
+                if self.answer_mode == "single":
+                    documents = self.retrieve(question, history, collection)
+                    prompt = self._build_prompt(question, documents, history, summary)
+                    answer = llm.invoke(prompt, config={"callbacks": [callback]}).content
+                else:
+                    # A cadeia não guarda memória: o histórico pertence à sessão do usuário
+                    qa_chain = self._build_qa_chain(llm, self._retriever_for(collection))
+                    chat_history = self.memory.with_summary(history, summary)
+                    output = qa_chain.invoke({"question": question, "chat_history": chat_history},
+                                             config={"callbacks": [callback]})
+                    answer = output.get("answer")
+                    documents = output.get("source_documents", [])
+            metrics.inc("answers_total", mode=self.answer_mode, cached="false")
+            logger.info("answer", extra={"mode": self.answer_mode, "total": round(timer.elapsed, 3),
+                                         "spans": {k: round(v, 3) for k, v in callback.spans.items()}})
+            result["documents"] = documents
+            if not answer:
+                result["answer"] = "Não foi possível gerar uma resposta."
+                return result
+
+            if not history and own_collection:
+                self.cache.put(question, answer, self._page_ids(documents))
+            result["answer"] = answer
+            return result
             
         except Exception as e:
-            print(f"Erro ao processar pergunta: {e}")
-            return f"Erro ao processar sua pergunta: {str(e)}"
+            logger.exception("erro ao processar pergunta")
+            result["answer"] = f"Erro ao processar sua pergunta: {str(e)}"
+            result["error"] = str(e)
+            return result
+
+    def stream_respond(self, question: str, history: List,
+                       temperature: Optional[float] = None, max_tokens: Optional[int] = None,
+                       summary: str = "") -> Iterator[str]:
+        """Responde em streaming com uma única chamada ao LLM: recupera o contexto antes e repassa os tokens"""
+        if not question.strip():
+            yield "Por favor, faça uma pergunta válida."
+            return
+
+        try:
+            start = time.perf_counter()
+            documents = self.retrieve(question, history)
+            retrieval_elapsed = time.perf_counter() - start
+            prompt = self._build_prompt(question, documents, history, summary)
+            answer = []
+            first_token = None
+            with timed("llm_seconds", stage="answer") as generation:
+                llm_start = time.perf_counter()
+                for chunk in self._session_llm(temperature, max_tokens).stream(prompt):
+                    if chunk.content:
+                        if first_token is None:
+                            first_token = time.perf_counter() - llm_start
+                            metrics.observe("llm_ttft_seconds", first_token, stage="answer")
+                        answer.append(chunk.content)
+                        yield chunk.content
+            total = time.perf_counter() - start
+            metrics.observe("answer_seconds", total, mode="stream")
+            metrics.inc("answers_total", mode="stream", cached="false")
+            logger.info("answer", extra={
+                "mode": "stream", "total": round(total, 3), "documents": len(documents),
+                "spans": {"retrieval": round(retrieval_elapsed, 3), "ttft": round(first_token or 0.0, 3),
+                          "answer": round(generation.elapsed, 3)},
+            })
+
+            if answer and not history:
+                self.cache.put(question, "".join(answer), self._page_ids(documents))
+        except Exception as e:
+            logger.exception("erro ao processar pergunta")
+            yield f"Erro ao processar sua pergunta: {str(e)}"
 
-    def _initialize_qa_chain(self):
-        """Inicializa a cadeia de QA se não existir"""
+    def _build_qa_chain(self, llm, retriever=None):
+        """Cria uma cadeia de QA sem estado para os parâmetros informados"""
         from langchain.chains import ConversationalRetrievalChain
-        from langchain.memory import ConversationBufferMemory
-        
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
-        
-        self.qa_chain = ConversationalRetrievalChain.from_llm(
-            llm=self.llm,
-            retriever=self.vectorstore.as_retriever(),
-            memory=self.memory,
+
+        return ConversationalRetrievalChain.from_llm(
+            llm=llm,
+            retriever=retriever or self.retriever,
+            # Tag separa a reformulação da pergunta da resposta nas métricas
+            condense_question_llm=llm.with_config(tags=[CONDENSE_TAG]),
+            return_source_documents=True,
             verbose=True
-        )
\ No newline at end of file
+        )
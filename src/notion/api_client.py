@@ -1,21 +1,250 @@
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import requests
-from typing import List, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from src.utils.logging import get_logger, metrics, timed
+from .block_cache import BlockCache
+from .rate_limiter import TokenBucketRateLimiter
+
+NOTION_API_URL = "https://api.notion.com/v1"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout)
+DEFAULT_TIMEOUT = (5.0, 30.0)  # (conexão, leitura) em segundos
+
+logger = get_logger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos de espera do cabeçalho Retry-After (número ou data HTTP); None se inválido"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class NotionFetchError(Exception):
+    """Falha ao buscar conteúdo do Notion (distinta de um resultado vazio)"""
+
 
 class NotionAPIClient:
-    def __init__(self, token: str, version: str):
+    """Cliente HTTP do Notion com retry, rate limit e cache opcional de blocos
+
+    Com `cache`, os filhos de um bloco só são buscados de novo quando o
+    `last_edited_time` informado (o da página que contém o bloco) difere do
+    que foi gravado. Com `offline`, nenhuma requisição é feita: tudo vem do
+    cache (replay reprodutível) e uma ausência no cache é um erro.
+    """
+
+    def __init__(self, token: str, version: str,
+                 rate_limiter: Optional[TokenBucketRateLimiter] = None,
+                 max_retries: int = 5,
+                 pool_size: int = 10,
+                 base_url: Optional[str] = None,
+                 backoff_base: float = 0.5,
+                 cache: Optional[BlockCache] = None,
+                 offline: bool = False,
+                 timeout: Optional[Tuple[float, float]] = None):
         self.headers = {
             "Authorization": f"Bearer {token}",
             "Notion-Version": version,
             "Content-Type": "application/json"
         }
-    
-    def get_block_children(self, block_id: str) -> List[Dict[str, Any]]:
-        """Busca blocos filhos com paginação"""
-        url = f"https://api.notion.com/v1/blocks/{block_id}/children"
-        try:
-            response = requests.get(url, headers=self.headers)
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.base_url = (base_url or os.getenv("NOTION_API_URL") or NOTION_API_URL).rstrip("/")
+        self.backoff_base = backoff_base
+        # Sem timeout uma conexão travada prende a thread (e o lock de sincronização) para sempre
+        self.timeout = timeout or (
+            float(os.getenv("NOTION_CONNECT_TIMEOUT", DEFAULT_TIMEOUT[0])),
+            float(os.getenv("NOTION_READ_TIMEOUT", DEFAULT_TIMEOUT[1])),
+        )
+        self.cache = cache
+        self.offline = offline
+        if offline and cache is None:
+            raise ValueError("O modo offline requer um BlockCache")
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Sessão única com keep-alive e pool de conexões
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """Executa uma requisição com retry e backoff exponencial com jitter
+
+        Respostas 429/5xx, falhas de conexão e timeouts são repetidos até
+        `max_retries` vezes; depois disso o erro é propagado.
+        """
+        url = f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            try:
+                with timed("notion_request_seconds", method=method):
+                    response = self.session.request(method, url, **kwargs)
+            except RETRY_ERRORS as e:
+                error = "timeout" if isinstance(e, requests.Timeout) else "connection"
+                metrics.inc("notion_requests_total", status=error)
+                if attempt >= self.max_retries:
+                    raise
+                metrics.inc("notion_retries_total", status=error)
+                logger.warning("falha de rede no Notion; tentando de novo",
+                               extra={"path": path, "error": str(e), "attempt": attempt + 1})
+                time.sleep(self._backoff(attempt))
+                continue
+            metrics.inc("notion_requests_total", status=response.status_code)
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                metrics.inc("notion_retries_total", status=response.status_code)
+                delay = parse_retry_after(response.headers.get("Retry-After"))
+                if delay is None:
+                    delay = self._backoff(attempt)
+                if response.status_code == 429:
+                    metrics.inc("notion_rate_limited_total")
+                    logger.warning("notion rate limited", extra={"path": path, "retry_after": delay})
+                if response.status_code == 429 and self.rate_limiter:
+                    # Respeita o Retry-After informado pelo Notion para todas as threads
+                    self.rate_limiter.backoff(delay)
+                else:
+                    time.sleep(delay)
+                continue
             response.raise_for_status()
-            return response.json().get("results", [])
+            return response.json()
+        return {}
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, self.backoff_base * 2 ** attempt)
+
+    def _paginate(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Percorre todas as páginas de resultados usando start_cursor"""
+        cursor = None
+        while True:
+            if method == "GET":
+                params = {"page_size": 100}
+                if cursor:
+                    params["start_cursor"] = cursor
+                data = self._request(method, path, params=params)
+            else:
+                payload = dict(body or {}, page_size=100)
+                if cursor:
+                    payload["start_cursor"] = cursor
+                data = self._request(method, path, json=payload)
+
+            yield from data.get("results", [])
+
+            if not data.get("has_more"):
+                break
+            cursor = data.get("next_cursor")
+
+    def get_block_children(self, block_id: str, last_edited_time: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Busca blocos filhos com paginação
+
+        `last_edited_time` é o da página: se bater com o gravado no cache, não há
+        requisição. O do próprio bloco não serve, pois não muda quando um
+        descendente é editado; o da página muda a cada edição em qualquer nível.
+        Levanta `NotionFetchError` se a busca falhar (ou faltar no cache offline).
+        """
+        if self.cache is not None:
+            cached = self.cache.get_children(block_id)
+            if cached is not None and (self.offline or (last_edited_time and cached[0] == last_edited_time)):
+                self.cache_hits += 1
+                return cached[1]
+            self.cache_misses += 1
+            if self.offline:
+                raise NotionFetchError(f"Bloco {block_id} ausente do cache offline")
+
+        try:
+            blocks = list(self._paginate("GET", f"/blocks/{block_id}/children"))
         except requests.exceptions.RequestException as e:
-            print(f"Erro ao buscar bloco {block_id}: {e}")
-            return []
\ No newline at end of file
+            # Uma lista vazia seria lida como "página sem conteúdo" e apagaria os vetores
+            logger.error("erro ao buscar bloco", extra={"block_id": block_id, "error": str(e)})
+            raise NotionFetchError(f"Erro ao buscar filhos do bloco {block_id}: {e}") from e
+        if self.cache is not None:
+            self.cache.put_children(block_id, last_edited_time, blocks)
+        return blocks
+
+    def get_page(self, page_id: str) -> Dict[str, Any]:
+        """Busca os metadados de uma página (inclui last_edited_time)"""
+        if self.offline:
+            return self.cache.get_page(page_id) or {}
+        try:
+            page = self._request("GET", f"/pages/{page_id}")
+        except requests.exceptions.RequestException as e:
+            logger.error("erro ao buscar página", extra={"page_id": page_id, "error": str(e)})
+            return {}
+        if self.cache is not None and page.get("id"):
+            self.cache.put_page(page)
+        return page
+
+    def is_page_removed(self, page_id: str) -> bool:
+        """Confirma na API que a página foi apagada (404, arquivada ou na lixeira)
+
+        Levanta `NotionFetchError` se não for possível confirmar.
+        """
+        if self.offline:
+            raise NotionFetchError("Não é possível confirmar remoções no modo offline")
+        try:
+            page = self._request("GET", f"/pages/{page_id}")
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return True
+            raise NotionFetchError(f"Erro ao buscar a página {page_id}: {e}") from e
+        except requests.exceptions.RequestException as e:
+            raise NotionFetchError(f"Erro ao buscar a página {page_id}: {e}") from e
+        return bool(page.get("archived") or page.get("in_trash"))
+
+    def query_database(self, database_id: str, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Lista todas as linhas (páginas) de um banco de dados, com paginação
+
+        Levanta `NotionFetchError` se a consulta falhar.
+        """
+        if self.offline:
+            cached = self.cache.get_children(database_id)
+            if cached is None:
+                raise NotionFetchError(f"Banco {database_id} ausente do cache offline")
+            return cached[1]
+        body = {"filter": filter} if filter else {}
+        try:
+            rows = list(self._paginate("POST", f"/databases/{database_id}/query", body))
+        except requests.exceptions.RequestException as e:
+            logger.error("erro ao consultar banco", extra={"database_id": database_id, "error": str(e)})
+            raise NotionFetchError(f"Erro ao consultar o banco {database_id}: {e}") from e
+        if self.cache is not None and not filter:
+            self.cache.put_children(database_id, None, rows)
+        return rows
+
+    def search(self, query: str = "", object_type: Optional[str] = "page",
+               sort_by_last_edited: bool = False) -> Iterator[Dict[str, Any]]:
+        """Percorre os resultados da busca do Notion (páginas compartilhadas com a integração)"""
+        if self.offline:
+            # Sem rede, a busca cobre as páginas em cache, da edição mais recente para a mais antiga
+            return (page for page in self.cache.iter_pages()
+                    if not query or query.lower() in json.dumps(page.get("properties", {}), ensure_ascii=False).lower())
+        body: Dict[str, Any] = {"query": query} if query else {}
+        if object_type:
+            body["filter"] = {"property": "object", "value": object_type}
+        if sort_by_last_edited:
+            body["sort"] = {"timestamp": "last_edited_time", "direction": "descending"}
+        return self._paginate("POST", "/search", body)
+
+    def close(self) -> None:
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
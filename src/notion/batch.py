@@ -0,0 +1,137 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional
+from src.utils.llm import llm_flight, embedding_flight
+from src.utils.logging import timed
+
+
+def is_relevant(document, relevant: List[str]) -> bool:
+    """O trecho é relevante se for um dos block_ids esperados ou contiver um dos textos"""
+    block_id = document.metadata.get("block_id")
+    return any(item == block_id or item.lower() in document.page_content.lower() for item in relevant)
+
+
+def load_questions(path: str) -> List[Dict[str, Any]]:
+    """Lê perguntas em JSONL ({"question", "relevant"?, "history"?}) ou uma por linha"""
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            samples.append(json.loads(line) if line.startswith("{") else {"question": line})
+    return samples
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class QuestionResult:
+    question: str
+    answer: str
+    latency: float
+    cached: bool = False
+    documents: int = 0
+    hit: Optional[bool] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchReport:
+    results: List[QuestionResult] = field(default_factory=list)
+    wall_time: float = 0.0
+    embed_time: float = 0.0
+    answer_cache: Dict[str, float] = field(default_factory=dict)
+    embedding_cache: Dict[str, float] = field(default_factory=dict)
+    single_flight: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        return len(self.results) / self.wall_time if self.wall_time else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = [r.latency for r in self.results if r.error is None]
+        judged = [r.hit for r in self.results if r.hit is not None]
+        return {
+            "questions": len(self.results),
+            "errors": sum(r.error is not None for r in self.results),
+            "throughput_qps": self.throughput,
+            "latency_mean": statistics.mean(latencies) if latencies else 0.0,
+            "latency_p50": percentile(latencies, 0.5),
+            "latency_p95": percentile(latencies, 0.95),
+            "latency_p99": percentile(latencies, 0.99),
+            "answer_cache_hit_rate": sum(r.cached for r in self.results) / len(self.results) if self.results else 0.0,
+            "embedding_cache_hit_rate": self.embedding_cache.get("hit_rate", 0.0),
+            "retrieval_hit_rate": sum(judged) / len(judged) if judged else None,
+            "query_embedding_seconds": self.embed_time,
+            "llm_calls_saved": self.single_flight.get("llm", {}).get("saved", 0),
+            "query_embeddings_saved": self.single_flight.get("embedding", {}).get("saved", 0),
+        }
+
+
+class BatchRunner:
+    """Executa um lote de perguntas no NotionAgent com concorrência configurável
+
+    Os embeddings de todas as perguntas são calculados antes, em lotes; durante
+    as respostas, a busca vetorial e o cache semântico os encontram no cache
+    do `EmbeddingService` em vez de codificar uma pergunta por vez.
+    """
+
+    def __init__(self, agent, concurrency: int = 4, embed_batch_size: int = 64):
+        self.agent = agent
+        self.concurrency = concurrency
+        self.embed_batch_size = embed_batch_size
+
+    def embed_questions(self, questions: List[str]) -> float:
+        unique = list(dict.fromkeys(q for q in questions if q.strip()))
+        with timed("batch_embed_seconds") as timer:
+            for start in range(0, len(unique), self.embed_batch_size):
+                self.agent.embeddings.embed_documents(unique[start:start + self.embed_batch_size])
+        return timer.elapsed
+
+    def _ask(self, sample: Dict[str, Any]) -> QuestionResult:
+        question = sample["question"]
+        history = [tuple(turn) for turn in sample.get("history", [])]
+        start = time.perf_counter()
+        output = self.agent.respond_with_sources(question, history)
+        result = QuestionResult(
+            question=question,
+            answer=output["answer"],
+            latency=time.perf_counter() - start,
+            cached=output["cached"],
+            documents=len(output["documents"]),
+            error=output.get("error"),
+        )
+        if sample.get("relevant") and not output["cached"]:
+            result.hit = any(is_relevant(doc, sample["relevant"]) for doc in output["documents"])
+        return result
+
+    def run(self, samples: List[Dict[str, Any]]) -> BatchReport:
+        report = BatchReport()
+        before = {"llm": llm_flight.stats(), "embedding": embedding_flight.stats()}
+        report.embed_time = self.embed_questions([sample["question"] for sample in samples])
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            report.results = list(executor.map(self._ask, samples))
+        report.wall_time = time.perf_counter() - start
+        report.answer_cache = self.agent.cache.stats()
+        report.embedding_cache = self.agent.embeddings.stats()
+        report.single_flight = {
+            name: {"saved": flight.stats()["saved"] - before[name]["saved"]}
+            for name, flight in (("llm", llm_flight), ("embedding", embedding_flight))
+        }
+        return report
+
+    @staticmethod
+    def write_results(report: BatchReport, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for result in report.results:
+                f.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
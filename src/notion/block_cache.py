@@ -0,0 +1,85 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+
+DEFAULT_BLOCK_CACHE_PATH = "database/blocks.sqlite"
+
+
+class BlockCache:
+    """Cache persistente em SQLite do JSON bruto retornado pelo Notion
+
+    - `children`: filhos de um bloco/página (ou linhas de um banco), com o
+      `last_edited_time` do pai no momento da busca.
+    - `pages`: metadados das páginas (`get_page`).
+
+    Permite reprocessar (parser, chunker) sem rede e refazer buscas ao vivo
+    apenas dos blocos cujo `last_edited_time` mudou.
+    """
+
+    def __init__(self, path: str = DEFAULT_BLOCK_CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS children ("
+            "block_id TEXT PRIMARY KEY, last_edited_time TEXT, data TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "page_id TEXT PRIMARY KEY, last_edited_time TEXT, data TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_children(self, block_id: str) -> Optional[Tuple[Optional[str], List[Dict[str, Any]]]]:
+        """(last_edited_time do pai, filhos) ou None se o bloco nunca foi buscado"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_edited_time, data FROM children WHERE block_id = ?", (block_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put_children(self, block_id: str, last_edited_time: Optional[str],
+                     blocks: List[Dict[str, Any]]) -> None:
+        data = json.dumps(blocks, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO children (block_id, last_edited_time, data) VALUES (?, ?, ?)",
+                (block_id, last_edited_time, data)
+            )
+            self._conn.commit()
+
+    def get_page(self, page_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM pages WHERE page_id = ?", (page_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_page(self, page: Dict[str, Any]) -> None:
+        data = json.dumps(page, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (page_id, last_edited_time, data) VALUES (?, ?, ?)",
+                (page["id"], page.get("last_edited_time"), data)
+            )
+            self._conn.commit()
+
+    def iter_pages(self) -> Iterator[Dict[str, Any]]:
+        """Páginas em cache, da edição mais recente para a mais antiga"""
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM pages ORDER BY last_edited_time DESC").fetchall()
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            children = self._conn.execute("SELECT COUNT(*) FROM children").fetchone()[0]
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        return {"blocks": children, "pages": pages}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
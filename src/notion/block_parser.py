@@ -1,22 +1,140 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable
+
+BlockRenderer = Callable[["NotionBlockParser", Dict[str, Any]], str]
+
+_RENDERERS: Dict[str, BlockRenderer] = {}
+
+
+def renders(*block_types: str):
+    """Registra o método como renderizador dos tipos de bloco informados"""
+    def decorator(fn: BlockRenderer) -> BlockRenderer:
+        for block_type in block_types:
+            _RENDERERS[block_type] = fn
+        return fn
+    return decorator
+
 
 class NotionBlockParser:
+    """Converte blocos do Notion em markdown com despacho por tipo de bloco
+
+    Cada tipo tem um renderizador registrado em uma tabela; tipos sem
+    renderizador próprio caem no texto simples de `rich_text`, se houver.
+    """
+
+    def __init__(self):
+        self._renderers = dict(_RENDERERS)
+
+    def register(self, block_type: str, renderer: BlockRenderer) -> None:
+        """Adiciona ou substitui o renderizador de um tipo de bloco"""
+        self._renderers[block_type] = renderer
+
     @staticmethod
     def _extract_rich_text(rich_text: List[Dict[str, Any]]) -> str:
         """Extrai texto formatado com markdown básico"""
         text_parts = []
         for text in rich_text:
             content = text.get("plain_text", "")
-            if text.get("annotations", {}).get("bold"):
+            if not content:
+                continue
+
+            if text.get("type") == "equation":
+                text_parts.append(f"${text['equation'].get('expression', content)}$")
+                continue
+
+            annotations = text.get("annotations", {})
+            if annotations.get("code"):
+                content = f"`{content}`"
+            if annotations.get("bold"):
                 content = f"**{content}**"
+            if annotations.get("italic"):
+                content = f"*{content}*"
+            if annotations.get("strikethrough"):
+                content = f"~~{content}~~"
+
+            # Links em texto e menções a links/páginas
+            href = text.get("href")
+            if href:
+                content = f"[{content}]({href})"
             text_parts.append(content)
         return "".join(text_parts)
 
+    def _text(self, block: Dict[str, Any]) -> str:
+        return self._extract_rich_text(block.get(block["type"], {}).get("rich_text", []))
+
     def parse_block(self, block: Dict[str, Any]) -> str:
         """Processa um bloco individual"""
         block_type = block["type"]
+        renderer = self._renderers.get(block_type)
+        if renderer is not None:
+            return renderer(self, block)
+
         content = block.get(block_type, {})
-        
         if "rich_text" in content:
             return self._extract_rich_text(content["rich_text"])
-        return ""
\ No newline at end of file
+        return ""
+
+    def parse_blocks(self, blocks: Iterable[Dict[str, Any]], separator: str = "\n") -> str:
+        """Processa uma lista de blocos com um único join"""
+        parse_block = self.parse_block
+        return separator.join(text for text in map(parse_block, blocks) if text.strip())
+
+    @renders("heading_1", "heading_2", "heading_3")
+    def _heading(self, block: Dict[str, Any]) -> str:
+        level = int(block["type"][-1])
+        return f"{'#' * level} {self._text(block)}"
+
+    @renders("bulleted_list_item")
+    def _bulleted(self, block: Dict[str, Any]) -> str:
+        return f"- {self._text(block)}"
+
+    @renders("numbered_list_item")
+    def _numbered(self, block: Dict[str, Any]) -> str:
+        return f"1. {self._text(block)}"
+
+    @renders("to_do")
+    def _to_do(self, block: Dict[str, Any]) -> str:
+        checked = "x" if block["to_do"].get("checked") else " "
+        return f"- [{checked}] {self._text(block)}"
+
+    @renders("toggle")
+    def _toggle(self, block: Dict[str, Any]) -> str:
+        return f"▸ {self._text(block)}"
+
+    @renders("quote")
+    def _quote(self, block: Dict[str, Any]) -> str:
+        return f"> {self._text(block)}"
+
+    @renders("callout")
+    def _callout(self, block: Dict[str, Any]) -> str:
+        icon = (block["callout"].get("icon") or {}).get("emoji", "")
+        return f"{icon} {self._text(block)}".strip()
+
+    @renders("code")
+    def _code(self, block: Dict[str, Any]) -> str:
+        language = block["code"].get("language", "")
+        return f"```{language}\n{self._text(block)}\n```"
+
+    @renders("equation")
+    def _equation(self, block: Dict[str, Any]) -> str:
+        return f"$${block['equation'].get('expression', '')}$$"
+
+    @renders("bookmark", "embed", "link_preview")
+    def _link(self, block: Dict[str, Any]) -> str:
+        data = block[block["type"]]
+        url = data.get("url", "")
+        caption = self._extract_rich_text(data.get("caption", []))
+        return f"[{caption or url}]({url})" if url else caption
+
+    @renders("table_row")
+    def _table_row(self, block: Dict[str, Any]) -> str:
+        cells = (self._extract_rich_text(cell) for cell in block["table_row"].get("cells", []))
+        return f"| {' | '.join(cells)} |"
+
+    @renders("divider")
+    def _divider(self, block: Dict[str, Any]) -> str:
+        return "---"
+
+    @renders("table", "child_page", "child_database", "column_list", "column", "synced_block")
+    def _container(self, block: Dict[str, Any]) -> str:
+        # Só agrupam filhos; o conteúdo vem dos blocos filhos
+        return ""
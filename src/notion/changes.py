@@ -0,0 +1,278 @@
+"""Atualizações ao vivo do índice a partir de eventos de alteração do Notion
+
+- `ChangeQueue`: fila que agrupa rajadas de eventos da mesma página (debounce).
+- `ChangeFeedWorker`: reindexa só as páginas da fila (via `NotionAgent.sync_page`).
+- `WebhookServer`: endpoint HTTP que recebe os webhooks do Notion.
+- `SearchPoller`: alternativa sem webhook, consulta a busca ordenada por `last_edited_time`.
+"""
+import hashlib
+import hmac
+import ipaddress
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Tuple
+from src.utils.logging import get_logger, metrics
+
+logger = get_logger(__name__)
+
+DELETE_EVENTS = ("page.deleted",)
+Change = Tuple[str, str]  # (page_id, "update" | "delete")
+
+
+def page_change(event: Dict[str, Any]) -> Optional[Change]:
+    """Extrai (page_id, ação) de um evento de webhook do Notion; None se não afeta páginas"""
+    entity = event.get("entity") or {}
+    if entity.get("type") != "page" or not entity.get("id"):
+        return None
+    event_type = event.get("type", "")
+    return entity["id"], "delete" if event_type in DELETE_EVENTS else "update"
+
+
+def parent_id(page: Dict[str, Any]) -> Optional[str]:
+    """Página ou banco de dados pai de um objeto de página do Notion"""
+    parent = page.get("parent") or {}
+    return parent.get("page_id") or parent.get("database_id")
+
+
+def sign(secret: str, body: bytes) -> str:
+    """Assinatura no formato do cabeçalho X-Notion-Signature"""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+class ChangeQueue:
+    """Fila de páginas alteradas com agrupamento de eventos repetidos
+
+    Cada evento adia o processamento da página por `debounce` segundos, até no
+    máximo `max_delay` após o primeiro evento; assim uma sequência de edições
+    gera uma única reindexação. O último evento define a ação (update/delete).
+    """
+
+    def __init__(self, debounce: float = 2.0, max_delay: float = 30.0):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.received = 0
+        self.coalesced = 0
+        self._due: Dict[str, float] = {}
+        self._first: Dict[str, float] = {}
+        self._actions: Dict[str, str] = {}
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._due)
+
+    def put(self, page_id: str, action: str = "update") -> None:
+        with self._cond:
+            now = time.monotonic()
+            self.received += 1
+            if page_id in self._due:
+                self.coalesced += 1
+                metrics.inc("change_events_coalesced_total")
+            else:
+                self._first[page_id] = now
+            self._due[page_id] = min(now + self.debounce, self._first[page_id] + self.max_delay)
+            self._actions[page_id] = action
+            metrics.inc("change_events_total", action=action)
+            self._cond.notify_all()
+
+    def get_ready(self, timeout: Optional[float] = None) -> List[Change]:
+        """Aguarda até `timeout` e retorna as páginas cujo prazo de agrupamento venceu"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                ready = [page_id for page_id, due in self._due.items() if due <= now]
+                if ready:
+                    for page_id in ready:
+                        del self._due[page_id]
+                        del self._first[page_id]
+                    return [(page_id, self._actions.pop(page_id)) for page_id in ready]
+
+                waits = [due - now for due in self._due.values()]
+                if deadline is not None:
+                    if now >= deadline:
+                        return []
+                    waits.append(deadline - now)
+                self._cond.wait(min(waits) if waits else None)
+
+
+class ChangeFeedWorker:
+    """Consome a `ChangeQueue` em segundo plano reindexando apenas as páginas afetadas"""
+
+    def __init__(self, agent, queue: ChangeQueue):
+        self.agent = agent
+        self.queue = queue
+        self.processed = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+
+    def start(self) -> "ChangeFeedWorker":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            for page_id, action in self.queue.get_ready(timeout=1.0):
+                self.process(page_id, action)
+
+    def is_tracked(self, page_id: str) -> bool:
+        """Mesmo filtro do `SearchPoller`: só páginas indexadas ou filhas de indexadas"""
+        manifest = self.agent.sync.manifest
+        if manifest.is_tracked(page_id):
+            return True
+        # Página nova: o evento não traz o pai, então ele é consultado na API
+        page = self.agent.api_client.get_page(page_id)
+        return bool(page) and manifest.is_tracked(page_id, parent_id(page))
+
+    def process(self, page_id: str, action: str) -> None:
+        try:
+            if not self.is_tracked(page_id):
+                metrics.inc("change_pages_ignored_total")
+                logger.debug("página fora do workspace indexado; ignorando", extra={"page_id": page_id})
+                return
+            # O evento sozinho não basta para apagar vetores: a remoção é confirmada na API
+            if action == "delete" and not self.agent.api_client.is_page_removed(page_id):
+                metrics.inc("change_deletes_unconfirmed_total")
+                logger.warning("remoção não confirmada pelo Notion; reindexando",
+                               extra={"page_id": page_id})
+                action = "update"
+            if action == "delete":
+                result = self.agent.remove_page(page_id)
+            else:
+                result = self.agent.sync_page(page_id)
+            self.processed += 1
+            metrics.inc("change_pages_synced_total", action=action)
+            logger.info("página atualizada por evento", extra={
+                "page_id": page_id, "action": action, "skipped": result.skipped,
+                "upserted": len(result.upserted), "deleted": len(result.deleted),
+            })
+        except Exception:
+            logger.exception("erro ao reindexar página", extra={"page_id": page_id})
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    queue: ChangeQueue
+    secret: Optional[str] = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.secret and not hmac.compare_digest(sign(self.secret, body),
+                                                   self.headers.get("X-Notion-Signature", "")):
+            metrics.inc("webhook_rejected_total")
+            return self._reply(401, {"error": "invalid signature"})
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return self._reply(400, {"error": "invalid json"})
+
+        # Confirmação da assinatura do webhook: o token é exibido no log para cadastro no Notion
+        if isinstance(payload, dict) and "verification_token" in payload:
+            logger.info("webhook verification token recebido",
+                        extra={"verification_token": payload["verification_token"]})
+            return self._reply(200, {"ok": True})
+
+        queued = 0
+        for event in payload if isinstance(payload, list) else [payload]:
+            change = page_change(event)
+            if change:
+                self.queue.put(*change)
+                queued += 1
+        return self._reply(202, {"queued": queued})
+
+
+def _is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def start_webhook_server(queue: ChangeQueue, port: int, host: Optional[str] = None,
+                         secret: Optional[str] = None) -> ThreadingHTTPServer:
+    """Recebe webhooks do Notion (POST) em uma thread daemon e enfileira as páginas
+
+    Sem `secret` as requisições não são autenticadas, então o servidor só
+    aceita escutar em localhost (ex.: atrás de um proxy que valida a origem).
+    """
+    host = host or ("0.0.0.0" if secret else "127.0.0.1")
+    if not secret and not _is_loopback(host):
+        raise ValueError("NOTION_WEBHOOK_SECRET é obrigatório para receber webhooks fora de localhost")
+    handler = type("WebhookHandler", (_WebhookHandler,), {"queue": queue, "secret": secret})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="webhook-server", daemon=True).start()
+    logger.info("webhook server started", extra={"port": server.server_address[1]})
+    return server
+
+
+class SearchPoller:
+    """Alternativa ao webhook: consulta a busca do Notion ordenada por edição
+
+    Só percorre resultados a partir da última edição já vista e enfileira
+    páginas indexadas (ou filhas de páginas indexadas) cujo `last_edited_time` mudou.
+    """
+
+    def __init__(self, api_client, queue: ChangeQueue, manifest, interval: float = 60.0):
+        self.api_client = api_client
+        self.queue = queue
+        self.manifest = manifest
+        self.interval = interval
+        self.watermark = manifest.last_edited_time()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="search-poller", daemon=True)
+
+    def start(self) -> "SearchPoller":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("erro ao consultar alterações do Notion")
+
+    def _is_tracked(self, page: Dict[str, Any]) -> bool:
+        return self.manifest.is_tracked(page["id"], parent_id(page))
+
+    def poll_once(self) -> int:
+        """Uma rodada de consulta; retorna quantas páginas foram enfileiradas"""
+        queued = 0
+        newest = self.watermark
+        for page in self.api_client.search(sort_by_last_edited=True):
+            edited = page.get("last_edited_time") or ""
+            # last_edited_time tem precisão de minuto: páginas no mesmo minuto da
+            # marca d'água podem ser novas; as já indexadas caem na comparação abaixo
+            if self.watermark and edited < self.watermark:
+                break
+            newest = max(newest, edited)
+            entry = self.manifest.get_page(page["id"])
+            if entry and entry.get("last_edited_time") == edited:
+                continue
+            if self._is_tracked(page):
+                self.queue.put(page["id"], "delete" if page.get("archived") or page.get("in_trash") else "update")
+                queued += 1
+        self.watermark = newest
+        metrics.inc("change_polls_total")
+        return queued
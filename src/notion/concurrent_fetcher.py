@@ -0,0 +1,41 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
+from .recursive_fetcher import RecursiveFetcher, BlockTree
+
+class ConcurrentFetcher(RecursiveFetcher):
+    """Versão concorrente do RecursiveFetcher
+
+    As chamadas a `get_block_children` rodam em um pool de threads limitado;
+    o ritmo das requisições fica a cargo do rate limiter do `NotionAPIClient`
+    (`delay`, 0 por padrão, ainda espaça o envio das subárvores).
+    A saída é idêntica à do caminho serial.
+    """
+
+    def __init__(self, api_client, parser, max_workers: int = 8, max_depth: int = 5, delay: float = 0):
+        super().__init__(api_client, parser, delay=delay, max_depth=max_depth)
+        self.max_workers = max_workers
+
+    def fetch_tree(self, page_id: str, max_depth: Optional[int] = None,
+                   last_edited_time: Optional[str] = None) -> BlockTree:
+        """Busca a árvore de blocos em paralelo"""
+        tree: BlockTree = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {
+                executor.submit(self.api_client.get_block_children, page_id, last_edited_time):
+                    (page_id, max_depth or self.max_depth)
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    block_id, depth_left = pending.pop(future)
+                    blocks = future.result()
+                    tree[block_id] = blocks
+                    for block in blocks:
+                        if self._should_descend(block, depth_left):
+                            if self.delay:
+                                time.sleep(self.delay)
+                            future = executor.submit(self.api_client.get_block_children, block["id"],
+                                                     last_edited_time)
+                            pending[future] = (block["id"], depth_left - 1)
+        return tree
@@ -0,0 +1,220 @@
+"""Servidor HTTP local que imita a API de blocos do Notion
+
+Usado para testar corretude e throughput do `NotionAPIClient` sem rede:
+
+    with FakeNotionServer(tree) as server:
+        client = NotionAPIClient("token", "2022-06-28", base_url=server.base_url)
+"""
+import json
+import re
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+
+CHILDREN_PATH = re.compile(r"^/v1/blocks/([^/]+)/children$")
+PAGE_PATH = re.compile(r"^/v1/pages/([^/]+)$")
+DATABASE_QUERY_PATH = re.compile(r"^/v1/databases/([^/]+)/query$")
+
+
+def make_paragraph(block_id: str, text: str, has_children: bool = False) -> Dict[str, Any]:
+    """Cria um bloco de parágrafo no formato da API"""
+    return {
+        "object": "block",
+        "id": block_id,
+        "type": "paragraph",
+        "has_children": has_children,
+        "last_edited_time": "2024-01-01T00:00:00.000Z",
+        "paragraph": {"rich_text": [{"plain_text": text, "annotations": {}}]},
+    }
+
+
+def build_tree(root_id: str = "root", width: int = 5, depth: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+    """Gera uma árvore sintética de blocos: {block_id: [filhos]}"""
+    tree: Dict[str, List[Dict[str, Any]]] = {}
+
+    def add(parent: str, level: int) -> None:
+        children = []
+        for i in range(width):
+            block_id = f"{parent}-{i}"
+            has_children = level < depth - 1
+            children.append(make_paragraph(block_id, f"Bloco {block_id}", has_children))
+            if has_children:
+                add(block_id, level + 1)
+        tree[parent] = children
+
+    add(root_id, 0)
+    return tree
+
+
+class FakeNotionServer:
+    """Servidor fake com paginação por cursor, latência e erros 429/5xx injetáveis"""
+
+    def __init__(self, tree: Dict[str, List[Dict[str, Any]]], latency: float = 0.0,
+                 fail_every: int = 0, fail_status: int = 429, retry_after: Optional[float] = 0.01,
+                 pages: Optional[Dict[str, Dict[str, Any]]] = None,
+                 databases: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.tree = tree
+        self.pages = pages or {}
+        self.databases = databases or {}
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.first_request_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _next_request(self) -> int:
+        with self._lock:
+            if self.first_request_at is None:
+                self.first_request_at = time.time()
+            self.request_count += 1
+            return self.request_count
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                count = server._next_request()
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if server.fail_every and count % server.fail_every == 0:
+                    headers = {}
+                    if server.fail_status == 429 and server.retry_after is not None:
+                        headers["Retry-After"] = str(server.retry_after)
+                    return self._send(server.fail_status, {"object": "error"}, headers)
+
+                path, _, query = self.path.partition("?")
+                page_match = PAGE_PATH.match(path)
+                if page_match:
+                    page_id = page_match.group(1)
+                    page = server.pages.get(page_id)
+                    if page is None and page_id in server.tree:
+                        page = {"object": "page", "id": page_id,
+                                "last_edited_time": "2024-01-01T00:00:00.000Z"}
+                    if page is None:
+                        return self._send(404, {"object": "error", "code": "object_not_found"})
+                    return self._send(200, page)
+
+                match = CHILDREN_PATH.match(path)
+                if not match:
+                    return self._send(404, {"object": "error", "code": "object_not_found"})
+
+                params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+                self._send_page(server.tree.get(match.group(1), []), params)
+
+            def do_POST(self):
+                server._next_request()
+                if server.latency:
+                    time.sleep(server.latency)
+
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                match = DATABASE_QUERY_PATH.match(self.path)
+                if match:
+                    return self._send_page(server.databases.get(match.group(1), []), body)
+                if self.path == "/v1/search":
+                    results = list(server.pages.values())
+                    if body.get("sort"):
+                        results.sort(key=lambda page: page.get("last_edited_time", ""), reverse=True)
+                    return self._send_page(results, body)
+                self._send(404, {"object": "error", "code": "object_not_found"})
+
+            def _send_page(self, results: List[Dict[str, Any]], params: Dict[str, Any]):
+                page_size = min(int(params.get("page_size", 100)), 100)
+                start = int(params.get("start_cursor") or 0)
+                page = results[start:start + page_size]
+                has_more = start + page_size < len(results)
+                self._send(200, {
+                    "object": "list",
+                    "results": page,
+                    "has_more": has_more,
+                    "next_cursor": str(start + page_size) if has_more else None,
+                })
+
+        return Handler
+
+    def start(self) -> "FakeNotionServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeNotionServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class FakeEventSource:
+    """Fonte local de eventos de alteração para testar as atualizações ao vivo
+
+    `edit` altera uma página do `FakeNotionServer` (novo parágrafo e novo
+    `last_edited_time`) e envia `events` webhooks no formato do Notion para
+    `webhook_url`, simulando uma rajada de edições na mesma página.
+    """
+
+    def __init__(self, server: FakeNotionServer, webhook_url: str, secret: Optional[str] = None):
+        self.server = server
+        self.webhook_url = webhook_url
+        self.secret = secret
+        self.sent = 0
+
+    def _post(self, payload: Any) -> int:
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            from .changes import sign
+            headers["X-Notion-Signature"] = sign(self.secret, body)
+        request = urllib.request.Request(self.webhook_url, data=body, headers=headers, method="POST")
+        with urllib.request.urlopen(request) as response:
+            self.sent += 1
+            return response.status
+
+    def edit(self, page_id: str, text: str = "Conteúdo editado", events: int = 1) -> None:
+        edited = datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+        blocks = self.server.tree.setdefault(page_id, [])
+        paragraph = make_paragraph(f"{page_id}-edit-{len(blocks)}", text)
+        paragraph["last_edited_time"] = edited
+        blocks.append(paragraph)
+        page = self.server.pages.setdefault(page_id, {"object": "page", "id": page_id})
+        page["last_edited_time"] = edited
+
+        for _ in range(events):
+            self._post({"type": "page.content_updated", "timestamp": edited,
+                        "entity": {"id": page_id, "type": "page"}})
+
+    def delete(self, page_id: str) -> None:
+        self.server.tree.pop(page_id, None)
+        self.server.pages.pop(page_id, None)
+        self._post({"type": "page.deleted", "entity": {"id": page_id, "type": "page"}})
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from src.utils.logging import get_logger, timed
+
+logger = get_logger(__name__)
+
+
+class IndexingWorker:
+    """Sincroniza o índice em segundo plano, sem bloquear a interface
+
+    As consultas continuam sendo atendidas pelo Chroma persistido enquanto a
+    sincronização roda. Cada página só é gravada depois de buscada e dividida
+    por completo: primeiro o upsert dos chunks novos, depois o delete dos
+    antigos, e o manifesto só registra a página quando as duas escritas deram
+    certo. Durante a troca uma consulta pode ver trechos novos e antigos juntos;
+    se uma escrita falhar, a página é refeita na próxima sincronização.
+
+    Com `prune` (desligado, como no `main.py` sem `--all`), páginas que deixaram
+    de ser alcançáveis a partir das raízes são removidas do índice.
+    """
+
+    def __init__(self, agent, roots: Optional[List[str]] = None, interval: float = 900,
+                 prune: bool = False):
+        self.agent = agent
+        self.roots = [root for root in roots or [] if root]
+        self.interval = interval
+        self.prune = prune
+        self.state = "ocioso"
+        self.progress = (0, 0)
+        self.last_error: Optional[str] = None
+        self.last_sync: Optional[float] = self._manifest_mtime()
+        self._trigger = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="indexing-worker", daemon=True)
+
+    def _manifest_mtime(self) -> Optional[float]:
+        path = self.agent.sync.manifest.path
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def start(self) -> "IndexingWorker":
+        self._thread.start()
+        self._trigger.set()  # primeira sincronização logo após a subida
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._trigger.set()
+        self._thread.join(timeout)
+
+    def trigger(self) -> None:
+        """Solicita uma sincronização imediata"""
+        self._trigger.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._trigger.wait(timeout=self.interval if self.interval > 0 else None)
+            self._trigger.clear()
+            if self._stop.is_set():
+                break
+            self.sync_now()
+
+    def sync_now(self) -> None:
+        self.state = "sincronizando"
+        self.last_error = None
+        done = failed = 0
+        # O total é estimado pelo manifesto, já que o workspace é descoberto ao percorrê-lo
+        total = max(1, self.agent.document_count())
+        self.progress = (0, total)
+        try:
+            with timed("sync_seconds") as timer:
+                for result in self.agent.sync_workspace(self.roots or None, prune=self.prune):
+                    done += 1
+                    failed += result.error is not None
+                    self.progress = (done, max(total, done))
+            logger.info("workspace sincronizado", extra={"pages": done, "failed": failed,
+                                                         "seconds": round(timer.elapsed, 3)})
+            if failed:
+                self.last_error = f"{failed} páginas não sincronizadas (erro ao buscar no Notion)"
+        except Exception as e:
+            logger.exception("erro ao sincronizar o workspace")
+            self.last_error = str(e)
+        self.progress = (done, done)
+        self.last_sync = time.time()
+        self.state = "erro" if self.last_error else "ocioso"
+
+    def status(self) -> Dict[str, Any]:
+        done, total = self.progress
+        return {
+            "state": self.state,
+            "documents": self.agent.document_count(),
+            "chunks": self.agent.chunk_count(),
+            "last_sync": datetime.fromtimestamp(self.last_sync) if self.last_sync else None,
+            "progress": done / total if total else 1.0,
+            "error": self.last_error,
+        }
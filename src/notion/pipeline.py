@@ -0,0 +1,219 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterable, Iterator, Callable
+from src.utils.logging import get_logger
+from .api_client import NotionFetchError
+from .recursive_fetcher import child_refs_from_tree
+from .sync import SyncResult
+
+logger = get_logger(__name__)
+
+_DONE = object()
+
+
+class _Cancelled(Exception):
+    """Outro estágio falhou; encerra este sem processar mais itens"""
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    busy: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, items: int, seconds: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy += seconds
+
+    @property
+    def throughput(self) -> float:
+        """Itens por segundo de trabalho efetivo do estágio"""
+        return self.items / self.busy if self.busy else 0.0
+
+
+class IngestionPipeline:
+    """Pipeline de ingestão em estágios: busca → parse → chunk → embed → upsert
+
+    Cada estágio roda em sua thread e se comunica com o próximo por filas
+    limitadas (`queue_size` páginas), então a busca na rede, o cálculo de
+    embeddings e a gravação no Chroma se sobrepõem, e a memória fica limitada
+    a poucas páginas em trânsito, independente do tamanho do workspace.
+    """
+
+    def __init__(self, sync, ingestor, embeddings, queue_size: int = 4, save_every: int = 20):
+        self.sync = sync
+        self.ingestor = ingestor
+        self.fetcher = sync.fetcher
+        self.embeddings = embeddings
+        self.queue_size = queue_size
+        self.save_every = save_every
+        self.stats: Dict[str, StageStats] = {
+            name: StageStats(name) for name in ("fetch", "parse", "chunk", "embed", "upsert")
+        }
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        # Páginas/bancos cuja busca falhou: impedem a remoção de páginas não visitadas
+        self.failures: List[str] = []
+
+    def _put(self, q: queue.Queue, item: Any) -> None:
+        while True:
+            if self._stop.is_set():
+                raise _Cancelled()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue) -> Any:
+        while True:
+            if self._stop.is_set():
+                raise _Cancelled()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _iter_queue(self, q: queue.Queue) -> Iterator[Any]:
+        while True:
+            item = self._get(q)
+            if item is _DONE:
+                return
+            yield item
+
+    def _run_stage(self, source: Iterable[Any], fn: Callable[[Any], Any], out: queue.Queue) -> None:
+        try:
+            for item in source:
+                self._put(out, fn(item))
+            self._put(out, _DONE)
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    def _timed(self, stage: str, fn: Callable[[Any], Any], count: Callable[[Any], int] = lambda _: 1):
+        def wrapper(item):
+            start = time.perf_counter()
+            result = fn(item)
+            self.stats[stage].add(count(result), time.perf_counter() - start)
+            return result
+        return wrapper
+
+    def _on_error(self, ref: Dict[str, Any], error: Exception) -> None:
+        logger.error("falha ao percorrer o workspace", extra={"id": ref["id"], "error": str(error)})
+        self.failures.append(ref["id"])
+
+    def _fetch(self, roots: Iterable[str], force: bool = False) -> Iterator[Dict[str, Any]]:
+        """Percorre o workspace buscando a árvore bruta apenas das páginas alteradas"""
+        def visit(ref):
+            start = time.perf_counter()
+            changed, last_edited = self.sync.needs_sync(ref["id"], force)
+            entry = self.sync.manifest.get_page(ref["id"]) or {}
+            item = {"ref": ref, "tree": None}
+            children = entry.get("children", [])
+            if changed:
+                try:
+                    tree = self.fetcher.fetch_tree(ref["id"], last_edited_time=last_edited)
+                except NotionFetchError as e:
+                    # A página fica como está no índice; as subpáginas conhecidas seguem na fila
+                    self._on_error(ref, e)
+                    item["error"] = str(e)
+                else:
+                    item = {"ref": ref, "tree": tree, "last_edited": last_edited}
+                    children = child_refs_from_tree(tree)
+            self.stats["fetch"].add(1, time.perf_counter() - start)
+            return item, children
+
+        for _, item in self.ingestor.crawl(roots, visit, self._on_error):
+            yield item
+
+    def _parse(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        if item["tree"] is not None:
+            item["sections"] = self.fetcher.render_sections(item["ref"]["id"], item.pop("tree"))
+        return item
+
+    def _chunk(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        if "sections" in item:
+            ref = item["ref"]
+            item["plan"] = self.sync.plan_page(ref["id"], item.pop("sections"), item["last_edited"],
+                                               self.ingestor.metadata(ref))
+        return item
+
+    def _embed(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        plan = item.get("plan")
+        if plan is not None and plan.texts:
+            item["vectors"] = self.embeddings.embed_documents(plan.texts)
+        return item
+
+    @staticmethod
+    def _chunk_count(item: Dict[str, Any]) -> int:
+        plan = item.get("plan")
+        return len(plan.texts) if plan is not None else 0
+
+    def run(self, roots: Iterable[str], prune: bool = False, force: bool = False) -> List[SyncResult]:
+        """Executa o pipeline e retorna o resultado por página
+
+        Com `force`, reprocessa também as páginas inalteradas (ex.: após mudar o parser).
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(4)]
+        stages = [
+            (self._fetch(roots, force), lambda item: item, queues[0]),
+            (self._iter_queue(queues[0]), self._timed("parse", self._parse), queues[1]),
+            (self._iter_queue(queues[1]), self._timed("chunk", self._chunk, self._chunk_count), queues[2]),
+            (self._iter_queue(queues[2]), self._timed("embed", self._embed, self._chunk_count), queues[3]),
+        ]
+        threads = [
+            threading.Thread(target=self._run_stage, args=stage, name=f"ingest-{name}", daemon=True)
+            for stage, name in zip(stages, ["fetch", "parse", "chunk", "embed"])
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Estágio final (upsert) na thread atual
+        results: List[SyncResult] = []
+        visited = set()
+        try:
+            for item in self._iter_queue(queues[3]):
+                ref = item["ref"]
+                visited.add(ref["id"])
+                plan = item.get("plan")
+                if plan is None:
+                    results.append(SyncResult(page_id=ref["id"], skipped=True, error=item.get("error")))
+                    continue
+                start = time.perf_counter()
+                results.append(self.sync.apply_plan(plan, item.get("vectors"), save=False))
+                self.stats["upsert"].add(len(plan.texts), time.perf_counter() - start)
+                if len(results) % self.save_every == 0:
+                    self.sync.manifest.save()
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            for thread in threads:
+                thread.join()
+            self.sync.manifest.save()
+
+        if self._errors:
+            raise self._errors[0]
+
+        if prune and self.failures:
+            logger.warning("remoção de páginas ignorada: houve falhas na busca",
+                           extra={"failures": len(self.failures)})
+        elif prune:
+            for page_id in [p for p in self.sync.manifest.pages if p not in visited]:
+                results.append(self.sync.remove_page(page_id))
+        return results
+
+    def report(self) -> str:
+        """Resumo de vazão por estágio"""
+        lines = []
+        for stats in self.stats.values():
+            lines.append(f"{stats.name:<7} {stats.items:>7} itens  {stats.busy:7.2f}s  {stats.throughput:9.1f}/s")
+        return "\n".join(lines)
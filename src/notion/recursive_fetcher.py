@@ -1,26 +1,128 @@
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from .api_client import NotionAPIClient
+from .block_cache import BlockCache, DEFAULT_BLOCK_CACHE_PATH
+
+# Subpáginas e bancos de dados viram documentos próprios, não conteúdo inline
+CHILD_PAGE_TYPES = ("child_page", "child_database")
+
+BlockTree = Dict[str, List[Dict[str, Any]]]
+
+
+def child_ref(block: Dict[str, Any]) -> Dict[str, Any]:
+    """Referência a uma subpágina/banco encontrado dentro de uma página"""
+    block_type = block["type"]
+    return {
+        "id": block["id"],
+        "type": "page" if block_type == "child_page" else "database",
+        "title": block.get(block_type, {}).get("title", ""),
+    }
+
+
+def child_refs_from_tree(tree: BlockTree) -> List[Dict[str, Any]]:
+    """Todas as subpáginas/bancos de uma árvore de blocos já buscada"""
+    return [child_ref(block) for blocks in tree.values() for block in blocks
+            if block["type"] in CHILD_PAGE_TYPES]
+
 
 class RecursiveFetcher:
-    def __init__(self, api_client, parser, delay: float = 0.3):
+    """Busca a árvore de blocos de uma página e a renderiza com o parser
+
+    A busca (`fetch_tree`) e a renderização (`render_sections`) são etapas
+    separadas para que possam rodar em estágios diferentes de um pipeline.
+    """
+
+    def __init__(self, api_client, parser, delay: float = 0.3, max_depth: int = 5):
         self.api_client = api_client
         self.parser = parser
         self.delay = delay
-    
-    def fetch_page(self, page_id: str, max_depth: int = 2) -> str:
-        """Busca conteúdo recursivamente"""
-        blocks = self.api_client.get_block_children(page_id)
-        content = []
-        
+        self.max_depth = max_depth
+
+    @staticmethod
+    def _should_descend(block: Dict[str, Any], max_depth: int) -> bool:
+        return bool(block.get("has_children")) and block["type"] not in CHILD_PAGE_TYPES and max_depth > 1
+
+    @classmethod
+    def offline(cls, parser, cache_path: str = DEFAULT_BLOCK_CACHE_PATH, **kwargs) -> "RecursiveFetcher":
+        """Fetcher que reproduz apenas o cache de blocos em disco, sem rede nem espera"""
+        api_client = NotionAPIClient("", "", cache=BlockCache(cache_path), offline=True)
+        kwargs.setdefault("delay", 0)
+        return cls(api_client, parser, **kwargs)
+
+    def fetch_tree(self, page_id: str, max_depth: Optional[int] = None,
+                   last_edited_time: Optional[str] = None) -> BlockTree:
+        """Busca os blocos até `max_depth` níveis: {block_id: [filhos]}
+
+        Com `last_edited_time` da página (e cache no cliente), a árvore vem do
+        cache quando a página não mudou desde a última busca; se mudou, todos os
+        níveis são buscados de novo.
+        """
+        tree: BlockTree = {}
+        self._fetch_subtree(page_id, max_depth or self.max_depth, tree, last_edited_time)
+        return tree
+
+    def _fetch_subtree(self, block_id: str, max_depth: int, tree: BlockTree,
+                       last_edited_time: Optional[str] = None) -> None:
+        blocks = self.api_client.get_block_children(block_id, last_edited_time)
+        tree[block_id] = blocks
         for block in blocks:
+            if self._should_descend(block, max_depth):
+                if self.delay:
+                    time.sleep(self.delay)
+                self._fetch_subtree(block["id"], max_depth - 1, tree, last_edited_time)
+
+    def fetch_page(self, page_id: str, max_depth: Optional[int] = None) -> str:
+        """Busca conteúdo recursivamente até `max_depth` níveis de blocos"""
+        return self._render(page_id, self.fetch_tree(page_id, max_depth))
+
+    def fetch_sections(self, page_id: str, max_depth: Optional[int] = None,
+                       last_edited_time: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Busca a página agrupando o conteúdo por bloco de primeiro nível
+
+        Cada seção traz em `child_refs` as subpáginas e bancos de dados encontrados.
+        """
+        return self.render_sections(page_id, self.fetch_tree(page_id, max_depth, last_edited_time))
+
+    def render_sections(self, page_id: str, tree: BlockTree) -> List[Dict[str, Any]]:
+        """Renderiza uma árvore já buscada, uma seção por bloco de primeiro nível"""
+        sections = []
+        for block in tree.get(page_id, []):
+            content = []
+            child_refs = []
+            if block["type"] in CHILD_PAGE_TYPES:
+                child_refs.append(child_ref(block))
+            else:
+                parsed = self.parser.parse_block(block)
+                if parsed:
+                    content.append(parsed)
+                if block["id"] in tree:
+                    child_content = self._render(block["id"], tree, child_refs)
+                    if child_content:
+                        content.append(child_content)
+            sections.append({
+                "block_id": block["id"],
+                "last_edited_time": block.get("last_edited_time"),
+                "text": "\n".join(content),
+                "child_refs": child_refs,
+            })
+        return sections
+
+    def _render(self, block_id: str, tree: BlockTree,
+                child_refs: Optional[List[Dict[str, Any]]] = None) -> str:
+        content = []
+        for block in tree.get(block_id, []):
+            if block["type"] in CHILD_PAGE_TYPES:
+                if child_refs is not None:
+                    child_refs.append(child_ref(block))
+                continue
+
             parsed = self.parser.parse_block(block)
             if parsed:
                 content.append(parsed)
             
-            if block.get("has_children"):
-                time.sleep(self.delay)
-                child_content = self.fetch_page(block["id"], max_depth-1)
+            if block["id"] in tree:
+                child_content = self._render(block["id"], tree, child_refs)
                 if child_content:
                     content.append(child_content)
         
-        return "\n".join(content)
\ No newline at end of file
+        return "\n".join(content)
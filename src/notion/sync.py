@@ -0,0 +1,309 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from src.utils.logging import get_logger
+from src.utils.text_processor import TextChunker
+from .api_client import NotionFetchError
+from .workspace import page_title
+
+DEFAULT_MANIFEST_PATH = "database/manifest.json"
+
+logger = get_logger(__name__)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SyncManifest:
+    """Manifesto persistido das páginas/blocos já indexados
+
+    Estrutura: {page_id: {"last_edited_time", "children", "metadata", "blocks": {block_id: {"last_edited_time", "hash", "vector_ids"}}}}
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        # Lido por threads de eventos (webhook/poller) enquanto a sincronização escreve
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self) -> None:
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                pages = json.load(f)
+            with self._lock:
+                self.pages = pages
+
+    def save(self) -> None:
+        """Grava de forma atômica para não corromper o manifesto"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.pages, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get_page(self, page_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.pages.get(page_id)
+
+    def set_page(self, page_id: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.pages[page_id] = entry
+
+    def remove_page(self, page_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.pages.pop(page_id, None)
+
+    def last_edited_time(self) -> str:
+        """Edição mais recente entre as páginas indexadas ("" se vazio)"""
+        with self._lock:
+            return max((entry.get("last_edited_time") or "" for entry in self.pages.values()), default="")
+
+    def is_tracked(self, page_id: str, parent_id: Optional[str] = None) -> bool:
+        """Página indexada, filha de página indexada ou já listada como filha de uma"""
+        ids = {page_id, parent_id} - {None}
+        with self._lock:
+            return any(i in self.pages for i in ids) or any(
+                child.get("id") in ids for entry in self.pages.values() for child in entry.get("children", [])
+            )
+
+
+@dataclass
+class SyncResult:
+    page_id: str
+    skipped: bool = False
+    upserted: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    # Preenchido quando a busca falhou: a página ficou como estava no índice
+    error: Optional[str] = None
+
+
+@dataclass
+class PagePlan:
+    """Alterações calculadas para uma página, prontas para gravar"""
+    page_id: str
+    entry: Dict[str, Any]
+    texts: List[str] = field(default_factory=list)
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    stale_ids: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+
+class IncrementalSync:
+    """Sincroniza páginas do Notion com o Chroma enviando apenas o que mudou
+
+    - Páginas cujo `last_edited_time` não mudou são ignoradas sem buscar blocos.
+    - Cada bloco de primeiro nível é dividido em chunks pelo `TextChunker`.
+    - Blocos com o mesmo hash de conteúdo mantêm seus vetores.
+    - Blocos novos/alterados são reindexados (upsert) e removidos são apagados.
+    """
+
+    def __init__(self, api_client, fetcher, vectorstore, manifest: Optional[SyncManifest] = None,
+                 chunker: Optional[TextChunker] = None, keyword_index=None):
+        self.api_client = api_client
+        self.fetcher = fetcher
+        self.vectorstore = vectorstore
+        self.manifest = manifest or SyncManifest()
+        self.chunker = chunker or TextChunker()
+        # Índice de palavras-chave (BM25) mantido em paralelo ao Chroma, se houver
+        self.keyword_index = keyword_index
+
+    def needs_sync(self, page_id: str, force: bool = False) -> Tuple[bool, Optional[str]]:
+        """Consulta o `last_edited_time` da página: (precisa sincronizar?, last_edited_time)"""
+        changed, page = self._check_page(page_id, force)
+        return changed, page.get("last_edited_time")
+
+    def _check_page(self, page_id: str, force: bool) -> Tuple[bool, Dict[str, Any]]:
+        previous = self.manifest.get_page(page_id) or {}
+        page = self.api_client.get_page(page_id)
+        last_edited = page.get("last_edited_time")
+
+        # Sem metadados da página não dá para comparar; mantém o índice como está
+        if not page or (not force and last_edited and previous.get("last_edited_time") == last_edited):
+            return False, page
+        return True, page
+
+    @staticmethod
+    def page_metadata(page: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadados de uma página que nunca passou pela varredura do workspace"""
+        parent = page.get("parent") or {}
+        return {
+            "title": page_title(page),
+            "parent_id": parent.get("page_id") or parent.get("database_id") or "",
+            "depth": 0,
+        }
+
+    def plan_page(self, page_id: str, sections: List[Dict[str, Any]], last_edited: Optional[str],
+                  metadata: Optional[Dict[str, Any]] = None) -> PagePlan:
+        """Divide as seções em chunks e calcula o que precisa ser gravado/apagado
+
+        Sem `metadata`, reutiliza os metadados gravados no manifesto, para que os
+        chunks de uma página não fiquem com metadados diferentes entre si.
+        """
+        previous = self.manifest.get_page(page_id) or {"blocks": {}}
+        old_blocks = previous.get("blocks", {})
+        if metadata is None:
+            metadata = previous.get("metadata") or {}
+        base_metadata = {**metadata, "source": page_id, "page_id": page_id}
+        # Metadados alterados (ex.: título) exigem regravar também os blocos inalterados
+        reuse_blocks = "metadata" not in previous or previous["metadata"] == base_metadata
+        plan = PagePlan(page_id=page_id, entry={
+            "last_edited_time": last_edited,
+            "children": [child for section in sections for child in section.get("child_refs", [])],
+            "metadata": base_metadata,
+            "blocks": {},
+        })
+        new_blocks = plan.entry["blocks"]
+
+        for section, documents in self.chunker.split_sections(sections, base_metadata):
+            block_id = section["block_id"]
+            if not documents:
+                continue
+
+            # O hash inclui o caminho de cabeçalhos, que faz parte do texto dos chunks
+            digest = content_hash("\x00".join(doc.page_content for doc in documents))
+            old = old_blocks.get(block_id)
+            if reuse_blocks and old and old["hash"] == digest:
+                new_blocks[block_id] = dict(old, last_edited_time=section["last_edited_time"])
+                plan.unchanged += 1
+                continue
+
+            vector_ids = [f"{block_id}:{doc.metadata['chunk_index']}" for doc in documents]
+            plan.texts.extend(doc.page_content for doc in documents)
+            plan.metadatas.extend(doc.metadata for doc in documents)
+            plan.ids.extend(vector_ids)
+            new_blocks[block_id] = {
+                "last_edited_time": section["last_edited_time"],
+                "hash": digest,
+                "vector_ids": vector_ids,
+            }
+
+        plan.stale_ids = [
+            vector_id
+            for block_id, old in old_blocks.items()
+            for vector_id in old["vector_ids"]
+            if vector_id not in new_blocks.get(block_id, {}).get("vector_ids", [])
+        ]
+        return plan
+
+    def apply_plan(self, plan: PagePlan, embeddings: Optional[List[List[float]]] = None,
+                   save: bool = True) -> SyncResult:
+        """Grava o plano no Chroma (e no BM25) e atualiza o manifesto
+
+        Com `embeddings` já calculados, grava direto na coleção sem recodificar.
+        O manifesto só é atualizado depois de todas as escritas: upsert e delete
+        são idempotentes, então após uma falha a próxima sincronização refaz a
+        página a partir do manifesto antigo. Ids novos já gravados são apagados
+        para não ficarem órfãos caso a página mude antes da nova tentativa.
+        """
+        result = SyncResult(page_id=plan.page_id, unchanged=plan.unchanged)
+        previous = self.manifest.get_page(plan.page_id) or {"blocks": {}}
+        known = {v for block in previous["blocks"].values() for v in block["vector_ids"]}
+        try:
+            # Upsert antes do delete: os embeddings são calculados antes de qualquer escrita
+            if plan.texts:
+                if embeddings is not None:
+                    self.vectorstore._collection.upsert(
+                        ids=plan.ids, embeddings=embeddings, documents=plan.texts, metadatas=plan.metadatas
+                    )
+                else:
+                    self.vectorstore.add_texts(texts=plan.texts, metadatas=plan.metadatas, ids=plan.ids)
+                if self.keyword_index is not None:
+                    self.keyword_index.add_texts(plan.texts, plan.metadatas, plan.ids)
+                result.upserted = plan.ids
+            if plan.stale_ids:
+                self.vectorstore.delete(ids=plan.stale_ids)
+                if self.keyword_index is not None:
+                    self.keyword_index.delete(plan.stale_ids)
+                result.deleted = plan.stale_ids
+        except Exception:
+            added = [v for v in plan.ids if v not in known]
+            logger.error("falha ao gravar página; desfazendo chunks novos",
+                         extra={"page_id": plan.page_id, "added": len(added)})
+            if added:
+                try:
+                    self.vectorstore.delete(ids=added)
+                    if self.keyword_index is not None:
+                        self.keyword_index.delete(added)
+                except Exception:
+                    logger.exception("falha ao desfazer chunks novos", extra={"page_id": plan.page_id})
+            raise
+
+        self.manifest.set_page(plan.page_id, plan.entry)
+        if save:
+            self.manifest.save()
+        return result
+
+    def sync_page(self, page_id: str, force: bool = False,
+                  metadata: Optional[Dict[str, Any]] = None) -> SyncResult:
+        """Sincroniza uma página e atualiza o manifesto
+
+        Se a busca dos blocos falhar (`NotionFetchError`), a exceção é propagada
+        antes de qualquer escrita: índice e manifesto ficam como estavam.
+        """
+        changed, page = self._check_page(page_id, force)
+        if not changed:
+            return SyncResult(page_id=page_id, skipped=True)
+
+        # Reindexação por evento: metadados do manifesto ou, para páginas novas, da própria página
+        previous = self.manifest.get_page(page_id) or {}
+        if metadata is None and not previous.get("metadata"):
+            metadata = self.page_metadata(page)
+        last_edited = page.get("last_edited_time")
+        sections = self.fetcher.fetch_sections(page_id, last_edited_time=last_edited)
+        return self.apply_plan(self.plan_page(page_id, sections, last_edited, metadata))
+
+    def sync_workspace(self, ingestor, roots: Iterable[str], prune: bool = True) -> Iterator[SyncResult]:
+        """Sincroniza todas as páginas alcançáveis a partir das raízes
+
+        Subpáginas de páginas inalteradas vêm do manifesto, então continuam sendo
+        visitadas sem buscar blocos. Com `prune`, páginas que deixaram de ser
+        alcançáveis são removidas do índice — exceto se alguma busca falhou,
+        pois páginas não visitadas por erro não podem ser dadas como removidas.
+        """
+        failures = []
+
+        def on_error(ref, error):
+            logger.error("falha ao percorrer o workspace", extra={"id": ref["id"], "error": str(error)})
+            failures.append(ref["id"])
+
+        def visit(ref):
+            try:
+                result = self.sync_page(ref["id"], metadata=ingestor.metadata(ref))
+            except NotionFetchError as e:
+                on_error(ref, e)
+                result = SyncResult(page_id=ref["id"], skipped=True, error=str(e))
+            # Em caso de falha, as subpáginas conhecidas continuam sendo visitadas
+            entry = self.manifest.get_page(ref["id"]) or {}
+            return result, entry.get("children", [])
+
+        visited = set()
+        for ref, result in ingestor.crawl(roots, visit, on_error):
+            visited.add(ref["id"])
+            yield result
+
+        if prune and failures:
+            logger.warning("remoção de páginas ignorada: houve falhas na busca",
+                           extra={"failures": len(failures)})
+        elif prune:
+            for page_id in [p for p in self.manifest.pages if p not in visited]:
+                yield self.remove_page(page_id)
+
+    def remove_page(self, page_id: str) -> SyncResult:
+        """Remove do índice todos os vetores de uma página"""
+        result = SyncResult(page_id=page_id)
+        previous = self.manifest.remove_page(page_id)
+        if previous:
+            result.deleted = [v for block in previous["blocks"].values() for v in block["vector_ids"]]
+            if result.deleted:
+                self.vectorstore.delete(ids=result.deleted)
+                if self.keyword_index is not None:
+                    self.keyword_index.delete(result.deleted)
+            self.manifest.save()
+        return result
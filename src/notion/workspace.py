@@ -0,0 +1,108 @@
+from collections import deque
+from typing import List, Dict, Any, Iterable, Iterator, Callable, Tuple, Optional, TYPE_CHECKING
+from .api_client import NotionFetchError
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+def page_title(page: Dict[str, Any]) -> str:
+    """Extrai o título de um objeto página (propriedade do tipo 'title')"""
+    for prop in page.get("properties", {}).values():
+        if prop.get("type") == "title":
+            return "".join(t.get("plain_text", "") for t in prop.get("title", []))
+    return ""
+
+
+def parse_roots(value: Optional[str]) -> List[str]:
+    """Lê uma lista de ids separados por vírgula (ex.: DEFAULT_PAGE_ID)"""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+class WorkspaceIngestor:
+    """Percorre várias páginas raiz do Notion em largura
+
+    - Visita cada página uma única vez (ids deduplicados).
+    - Desce em subpáginas (`child_page`) até `max_depth` níveis.
+    - Expande `child_database` consultando todas as linhas com paginação.
+    - Gera um documento por página, com metadados.
+    """
+
+    def __init__(self, api_client, fetcher, max_depth: int = 3):
+        self.api_client = api_client
+        self.fetcher = fetcher
+        self.max_depth = max_depth
+
+    def discover_roots(self) -> List[str]:
+        """Usa a busca do Notion para achar as páginas de nível superior compartilhadas"""
+        pages = list(self.api_client.search(object_type="page"))
+        top_level = [p["id"] for p in pages if p.get("parent", {}).get("type") == "workspace"]
+        return top_level or [p["id"] for p in pages]
+
+    def crawl(self, roots: Iterable[str],
+              visit: Callable[[Dict[str, Any]], Tuple[Any, List[Dict[str, Any]]]],
+              on_error: Optional[Callable[[Dict[str, Any], Exception], None]] = None) -> Iterator[Tuple[Dict[str, Any], Any]]:
+        """Percorre o workspace chamando `visit(ref) -> (resultado, subpáginas)` por página
+
+        Se a consulta de um banco de dados falhar, `on_error(ref, erro)` é chamado
+        e o banco é pulado; sem `on_error`, o `NotionFetchError` é propagado.
+        """
+        queue = deque({"id": root, "type": "page", "title": "", "parent_id": "", "depth": 0} for root in roots)
+        visited = set()
+
+        while queue:
+            ref = queue.popleft()
+            if ref["id"] in visited:
+                continue
+            visited.add(ref["id"])
+
+            if ref["type"] == "database":
+                try:
+                    rows = self.api_client.query_database(ref["id"])
+                except NotionFetchError as e:
+                    if on_error is None:
+                        raise
+                    on_error(ref, e)
+                    continue
+                # As linhas do banco ficam no mesmo nível do bloco que o contém
+                for row in rows:
+                    queue.append({
+                        "id": row["id"],
+                        "type": "page",
+                        "title": page_title(row),
+                        "parent_id": ref["id"],
+                        "depth": ref["depth"],
+                        "last_edited_time": row.get("last_edited_time", ""),
+                    })
+                continue
+
+            result, children = visit(ref)
+            yield ref, result
+
+            if ref["depth"] < self.max_depth:
+                for child in children:
+                    queue.append(dict(child, parent_id=ref["id"], depth=ref["depth"] + 1))
+
+    @staticmethod
+    def metadata(ref: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "source": ref["id"],
+            "page_id": ref["id"],
+            "title": ref.get("title", ""),
+            "parent_id": ref.get("parent_id", ""),
+            "depth": ref.get("depth", 0),
+        }
+
+    def iter_documents(self, roots: Iterable[str]) -> Iterator["Document"]:
+        """Gera um Document por página do workspace"""
+        from langchain_core.documents import Document
+
+        def visit(ref):
+            sections = self.fetcher.fetch_sections(ref["id"])
+            text = "\n".join(section["text"] for section in sections if section["text"])
+            children = [child for section in sections for child in section.get("child_refs", [])]
+            metadata = dict(self.metadata(ref), last_edited_time=ref.get("last_edited_time", ""))
+            return Document(page_content=text, metadata=metadata), children
+
+        for _, document in self.crawl(roots, visit):
+            yield document
@@ -0,0 +1,122 @@
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Iterable, Set
+
+
+def normalize_question(question: str) -> str:
+    """Normaliza caixa, acentos, pontuação e espaços para a comparação exata"""
+    text = unicodedata.normalize("NFKD", question.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    page_ids: Set[str] = field(default_factory=set)
+    embedding: Optional[List[float]] = None
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class SemanticCache:
+    """Cache de respostas com dois níveis: pergunta normalizada idêntica e
+    similaridade de embeddings acima de `threshold`. Limitado por LRU e TTL."""
+
+    def __init__(self, embeddings=None, threshold: float = 0.92,
+                 max_size: int = 256, ttl: float = 3600):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _expired(self, entry: CachedAnswer) -> bool:
+        return self.ttl > 0 and time.monotonic() - entry.created_at > self.ttl
+
+    def _evict_expired(self) -> None:
+        for key in [k for k, entry in self._entries.items() if self._expired(entry)]:
+            del self._entries[key]
+
+    def get(self, question: str) -> Optional[CachedAnswer]:
+        key = normalize_question(question)
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry
+            candidates = list(self._entries.items())
+
+        if self.embeddings is not None and candidates:
+            query = self.embeddings.embed_query(question)
+            best_key, best_score = None, self.threshold
+            for candidate_key, candidate in candidates:
+                if candidate.embedding is None:
+                    continue
+                score = cosine_similarity(query, candidate.embedding)
+                if score >= best_score:
+                    best_key, best_score = candidate_key, score
+            if best_key is not None:
+                with self._lock:
+                    entry = self._entries.get(best_key)
+                    if entry:
+                        self._entries.move_to_end(best_key)
+                        self.semantic_hits += 1
+                        return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, question: str, answer: str, page_ids: Iterable[str] = ()) -> None:
+        key = normalize_question(question)
+        embedding = self.embeddings.embed_query(question) if self.embeddings is not None else None
+        entry = CachedAnswer(question=question, answer=answer, page_ids=set(page_ids), embedding=embedding)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, page_ids: Iterable[str]) -> int:
+        """Remove respostas baseadas nas páginas informadas (ou sem origem conhecida)"""
+        page_ids = set(page_ids)
+        with self._lock:
+            keys = [k for k, entry in self._entries.items()
+                    if not entry.page_ids or entry.page_ids & page_ids]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {
+            "size": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
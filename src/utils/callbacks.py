@@ -0,0 +1,63 @@
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from src.utils.llm import CONDENSE_TAG
+from src.utils.logging import metrics
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Mede as chamadas ao LLM e ao retriever de uma cadeia LangChain
+
+    Registra `llm_seconds` e `llm_ttft_seconds` por etapa (`condense` ou
+    `answer`, conforme a tag da chamada) e `retrieval_seconds`; a última
+    execução de cada etapa fica em `spans` para o log da resposta.
+    """
+
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+
+    def _start(self, run_id: UUID, stage: str) -> None:
+        self._runs[run_id] = {"stage": stage, "start": time.perf_counter(), "first_token": None}
+
+    def _end(self, run_id: UUID, metric: str) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        elapsed = time.perf_counter() - run["start"]
+        metrics.observe(metric, elapsed, stage=run["stage"])
+        self.spans[run["stage"]] = elapsed
+
+    @staticmethod
+    def _stage(tags: Optional[List[str]]) -> str:
+        return CONDENSE_TAG if CONDENSE_TAG in (tags or []) else "answer"
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, tags: Optional[List[str]] = None, **kwargs):
+        self._start(run_id, self._stage(tags))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, tags: Optional[List[str]] = None, **kwargs):
+        self._start(run_id, self._stage(tags))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and run["first_token"] is None:
+            run["first_token"] = time.perf_counter() - run["start"]
+            metrics.observe("llm_ttft_seconds", run["first_token"], stage=run["stage"])
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._end(run_id, "llm_seconds")
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        metrics.inc("llm_errors_total")
+        self._end(run_id, "llm_seconds")
+
+    def on_retriever_start(self, serialized, query, *, run_id: UUID, **kwargs):
+        self._start(run_id, "retrieval")
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            elapsed = time.perf_counter() - run["start"]
+            metrics.observe("retrieval_seconds", elapsed)
+            self.spans["retrieval"] = elapsed
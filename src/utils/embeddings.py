@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import threading
+from array import array
+from typing import List, Dict, Optional
+from langchain_core.embeddings import Embeddings
+from src.utils.logging import metrics, timed
+
+DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+DEFAULT_CACHE_PATH = "database/embeddings.sqlite"
+DEFAULT_ONNX_DIR = "database/onnx"
+SENTENCE_BERT_CONFIG = "sentence_bert_config.json"
+BACKENDS = ("torch", "onnx", "onnx-int8")
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_vector(vector: List[float], dtype: str = "float32") -> bytes:
+    """Serializa um vetor em float32, float16 ou int8 (escala por vetor)"""
+    if dtype == "float32":
+        return array("f", vector).tobytes()
+    if dtype == "float16":
+        return struct.pack(f"<{len(vector)}e", *vector)
+    if dtype == "int8":
+        scale = max((abs(v) for v in vector), default=0.0) / 127 or 1.0
+        return struct.pack("<f", scale) + array("b", (round(v / scale) for v in vector)).tobytes()
+    raise ValueError(f"Tipo de armazenamento desconhecido: {dtype}")
+
+
+def decode_vector(blob: bytes, dtype: str = "float32") -> List[float]:
+    if dtype == "float32":
+        return array("f", blob).tolist()
+    if dtype == "float16":
+        return list(struct.unpack(f"<{len(blob) // 2}e", blob))
+    if dtype == "int8":
+        (scale,) = struct.unpack("<f", blob[:4])
+        return [v * scale for v in array("b", blob[4:])]
+    raise ValueError(f"Tipo de armazenamento desconhecido: {dtype}")
+
+
+class OnnxEncoder:
+    """Codificador sentence-transformers exportado para ONNX Runtime
+
+    Na primeira execução exporta o modelo para `export_dir` (e, com `quantize`,
+    aplica quantização dinâmica int8); depois só carrega o arquivo `.onnx`.
+    Usa mean pooling e o mesmo limite de tokens (`max_seq_length` do
+    sentence-transformers) do pipeline original, para que os vetores sejam
+    comparáveis aos do backend torch.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, quantize: bool = True,
+                 threads: Optional[int] = None, export_dir: str = DEFAULT_ONNX_DIR,
+                 max_length: Optional[int] = None):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+        import onnxruntime
+
+        model_dir = os.path.join(export_dir, model_name.replace("/", "__"))
+        file_name = "model_quantized.onnx" if quantize else "model.onnx"
+        if not os.path.exists(os.path.join(model_dir, file_name)):
+            self._export(model_name, model_dir, quantize)
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length or self._max_seq_length(model_name, model_dir, self.tokenizer)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir, file_name=file_name, session_options=options
+        )
+
+    @staticmethod
+    def _max_seq_length(model_name: str, model_dir: str, tokenizer) -> int:
+        """Limite de tokens do sentence-transformers (ex.: 128 no MiniLM multilíngue)"""
+        path = os.path.join(model_dir, SENTENCE_BERT_CONFIG)
+        if not os.path.exists(path):
+            try:
+                from huggingface_hub import hf_hub_download
+                shutil.copy(hf_hub_download(model_name, SENTENCE_BERT_CONFIG), path)
+            except Exception:
+                # Modelo sem configuração do sentence-transformers: vale o limite do tokenizer
+                return min(tokenizer.model_max_length, 512)
+        with open(path, encoding="utf-8") as f:
+            return int(json.load(f)["max_seq_length"])
+
+    @staticmethod
+    def _export(model_name: str, model_dir: str, quantize: bool) -> None:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(model_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+        if quantize:
+            quantizer = ORTQuantizer.from_pretrained(model)
+            config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            quantizer.quantize(save_dir=model_dir, quantization_config=config)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        inputs = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=self.max_length, return_tensors="np")
+        outputs = self.model(**inputs)
+        hidden = outputs.last_hidden_state
+        mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / mask.sum(axis=1).clip(min=1e-9)
+        return pooled.tolist()
+
+
+class EmbeddingCache:
+    """Cache persistente em SQLite indexado por (modelo, sha256 do texto)
+
+    `dtype` define como os vetores são gravados: float32 (padrão), float16
+    (metade do espaço) ou int8 com escala por vetor (um quarto do espaço).
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, dtype: str = "float32"):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Tipo de armazenamento desconhecido: {dtype}")
+        self.dtype = dtype
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Consulta em lotes para respeitar o limite de parâmetros do SQLite
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch]
+                )
+                for digest, blob in rows:
+                    found[digest] = decode_vector(blob, self.dtype)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(model, digest, encode_vector(vector, self.dtype)) for digest, vector in items.items()]
+            )
+            self._conn.commit()
+
+
+class EmbeddingService(Embeddings):
+    """Serviço de embeddings compartilhado: modelo carregado uma única vez,
+    codificação em lotes e cache em disco para nunca recodificar um chunk igual.
+
+    Backends: `torch` (HuggingFaceEmbeddings), `onnx` (ONNX Runtime fp32) e
+    `onnx-int8` (quantização dinâmica int8). `threads` limita os threads de CPU.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, batch_size: int = 32,
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH, device: str = "cpu",
+                 backend: str = "torch", threads: Optional[int] = None, storage_dtype: str = "float32"):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend de embeddings desconhecido: {backend}")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self.backend = backend
+        self.threads = threads
+        # Vetores de backends/formatos diferentes não são intercambiáveis no cache
+        # ":v2" descarta vetores ONNX antigos, truncados em 256 tokens em vez do max_seq_length
+        self.cache_key = model_name if backend == "torch" else f"{model_name}#{backend}:v2"
+        if storage_dtype != "float32":
+            self.cache_key = f"{self.cache_key}@{storage_dtype}"
+        self.cache = EmbeddingCache(cache_path, storage_dtype) if cache_path else None
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Carrega o modelo sob demanda, uma única vez"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None and self.backend != "torch":
+                    self._model = OnnxEncoder(self.model_name, quantize=self.backend == "onnx-int8",
+                                              threads=self.threads)
+                elif self._model is None:
+                    if self.threads:
+                        import torch
+                        torch.set_num_threads(self.threads)
+                    from langchain_community.embeddings import HuggingFaceEmbeddings
+                    self._model = HuggingFaceEmbeddings(
+                        model_name=self.model_name,
+                        model_kwargs={'device': self.device},
+                        encode_kwargs={'batch_size': self.batch_size}
+                    )
+        return self._model
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            with timed("embedding_batch_seconds", model=self.model_name, backend=self.backend):
+                vectors.extend(self.model.embed_documents(batch))
+            metrics.inc("embedding_texts_total", len(batch), model=self.model_name, backend=self.backend)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        cached = self.cache.get_many(self.cache_key, hashes) if self.cache else {}
+
+        # Codifica apenas textos ainda não vistos (deduplicados)
+        missing = {digest: text for digest, text in zip(hashes, texts) if digest not in cached}
+        if missing:
+            computed = dict(zip(missing, self._encode(list(missing.values()))))
+            if self.cache:
+                self.cache.put_many(self.cache_key, computed)
+                # Mesma precisão dos acertos: o vetor devolvido é o que foi gravado no cache
+                dtype = self.cache.dtype
+                computed = {digest: decode_vector(encode_vector(vector, dtype), dtype)
+                            for digest, vector in computed.items()}
+            cached.update(computed)
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        metrics.inc("embedding_cache_hits_total", len(texts) - len(missing))
+        return [cached[digest] for digest in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_services: Dict[tuple, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_name: Optional[str] = None, backend: Optional[str] = None) -> EmbeddingService:
+    """Retorna a instância compartilhada do serviço para o modelo/backend informado"""
+    model_name = model_name or os.getenv("EMBEDDINGS_MODEL") or DEFAULT_MODEL
+    backend = backend or os.getenv("EMBEDDINGS_BACKEND") or "torch"
+    key = (model_name, backend)
+    with _services_lock:
+        if key not in _services:
+            threads = os.getenv("EMBEDDINGS_THREADS")
+            _services[key] = EmbeddingService(
+                model_name=model_name,
+                batch_size=int(os.getenv("EMBEDDINGS_BATCH_SIZE", 32)),
+                backend=backend,
+                threads=int(threads) if threads else None,
+                storage_dtype=os.getenv("EMBEDDINGS_STORAGE", "float32")
+            )
+        return _services[key]
@@ -0,0 +1,74 @@
+import re
+import time
+from typing import Any, Iterator, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+FOLLOW_UP_PATTERN = re.compile(r"Follow Up Input:\s*(.*)", re.IGNORECASE)
+QUESTION_PATTERN = re.compile(r"(?:Pergunta|Question):\s*(.*)")
+# Início e fim do contexto no STREAM_PROMPT e no prompt padrão do ConversationalRetrievalChain
+CONTEXT_MARKERS = (
+    ("Documentos:", ("Conversa anterior:", "Pergunta:")),
+    ("make up an answer.", ("Question:",)),
+)
+
+
+def extract_context(prompt: str) -> str:
+    for start, ends in CONTEXT_MARKERS:
+        if start in prompt:
+            text = prompt.split(start, 1)[1]
+            for end in ends:
+                text = text.split(end, 1)[0]
+            return text
+    return ""
+
+
+class FakeChatModel(BaseChatModel):
+    """LLM local e determinístico para testes de carga e benchmarks offline
+
+    Para o prompt de reformulação do ConversationalRetrievalChain devolve a
+    própria pergunta; para os demais, responde com as primeiras palavras do
+    contexto. `latency` simula o tempo até o primeiro token e `token_latency`
+    o tempo de cada palavra gerada.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    answer_words: int = 40
+    temperature: float = 0.0
+    max_output_tokens: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        follow_up = FOLLOW_UP_PATTERN.search(prompt)
+        if follow_up:
+            return follow_up.group(1).strip()
+
+        question = QUESTION_PATTERN.findall(prompt)
+        words = extract_context(prompt).split()[:self.answer_words]
+        if not words:
+            return "Não sei."
+        prefix = f"Sobre \"{question[-1].strip()}\": " if question else ""
+        return prefix + " ".join(words)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        time.sleep(self.latency + self.token_latency * len(text.split()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for i, word in enumerate(self._reply(messages).split()):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            token = word if i == 0 else f" {word}"
+            if run_manager:
+                run_manager.on_llm_new_token(token)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
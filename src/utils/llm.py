@@ -1,18 +1,241 @@
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from dotenv import load_dotenv
+import copy
+import functools
+import hashlib
+import importlib
 import os
+import re
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from src.utils.logging import metrics
+
+# Tag que marca a chamada de reformulação da pergunta (condense) nas cadeias
+CONDENSE_TAG = "condense"
+# Parâmetros do modelo que mudam a geração e, portanto, a chave do single-flight
+GENERATION_PARAMS = ("model", "temperature", "max_output_tokens", "top_p", "top_k")
+WHITESPACE = re.compile(r"\s+")
+
+
+def __getattr__(name):
+    # Importado sob demanda: o callback depende do LangChain
+    if name == "LLMMetricsCallback":
+        return importlib.import_module("src.utils.callbacks").LLMMetricsCallback
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza unicode e espaços; não altera maiúsculas para não mudar o resultado"""
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def request_key(*parts: Any) -> str:
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """Chamada em andamento: resultado (ou trechos, no streaming) compartilhado com quem espera"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks: List[Any] = []
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished = False
+        self.followers = 0
+
+
+class SingleFlight:
+    """Agrupa chamadas idênticas simultâneas em uma única chamada ao serviço
+
+    A primeira chamada de uma chave executa `fn`; as que chegam enquanto ela
+    está em andamento esperam e recebem uma cópia do mesmo resultado (ou
+    exceção). Nada é guardado depois que a chamada termina: repetições
+    posteriores são tarefa dos caches. `saved` conta as chamadas evitadas
+    (métrica `singleflight_saved_total`).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.saved = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+                leader = True
+            else:
+                flight.followers += 1
+                self.saved += 1
+                leader = False
+        if leader:
+            metrics.inc("singleflight_calls_total", kind=self.name)
+        else:
+            metrics.inc("singleflight_saved_total", kind=self.name)
+        return flight, leader
+
+    def _finish(self, key: str, flight: _Flight, result: Any = None,
+                error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._flights.pop(key, None)
+            followers = flight.followers
+        with flight.cond:
+            # Cópia tirada antes de devolver o original: o chamador pode alterá-lo (ex.: ids das mensagens)
+            flight.result = copy.deepcopy(result) if followers and error is None else None
+            flight.error = error
+            flight.finished = True
+            flight.cond.notify_all()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        flight, leader = self._join(key)
+        if not leader:
+            with flight.cond:
+                flight.cond.wait_for(lambda: flight.finished)
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, flight, error=e)
+            raise
+        self._finish(key, flight, result)
+        return result
+
+    def stream(self, key: str, fn: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+        """Como `do`, mas repassa os trechos a quem espera à medida que chegam"""
+        flight, leader = self._join(key)
+        if not leader:
+            position = 0
+            while True:
+                with flight.cond:
+                    flight.cond.wait_for(lambda: position < len(flight.chunks) or flight.finished)
+                    if position < len(flight.chunks):
+                        chunk = flight.chunks[position]
+                    elif flight.error is not None:
+                        raise flight.error
+                    else:
+                        return
+                position += 1
+                yield copy.deepcopy(chunk)
+
+        try:
+            for chunk in fn():
+                with flight.cond:
+                    flight.chunks.append(copy.deepcopy(chunk))
+                    flight.cond.notify_all()
+                yield chunk
+        except BaseException as e:
+            # Inclui GeneratorExit: quem espera não deve receber uma resposta truncada como completa
+            error = e if isinstance(e, Exception) else RuntimeError("Geração compartilhada interrompida")
+            self._finish(key, flight, error=error)
+            raise
+        self._finish(key, flight)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "saved": self.saved, "in_flight": len(self._flights)}
+
+
+llm_flight = SingleFlight("llm")
+embedding_flight = SingleFlight("embedding")
+
+
+def single_flight_enabled() -> bool:
+    return os.getenv("SINGLE_FLIGHT", "true").lower() == "true"
+
+
+class SingleFlightChatMixin:
+    """Compartilha gerações idênticas simultâneas de um chat model do LangChain
+
+    A chave é o prompt normalizado (pergunta, trechos recuperados e histórico)
+    mais os parâmetros de geração; perguntas iguais com contextos diferentes
+    continuam gerando respostas separadas.
+    """
+
+    def _flight_key(self, kind: str, messages, stop, kwargs: Dict[str, Any]) -> str:
+        params = [(name, getattr(self, name, None)) for name in GENERATION_PARAMS]
+        prompt = [(message.type, normalize_text(str(message.content))) for message in messages]
+        return request_key(kind, self._llm_type, params, stop, sorted(kwargs.items()), prompt)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        key = self._flight_key("generate", messages, stop, kwargs)
+        return llm_flight.do(key, lambda: super(SingleFlightChatMixin, self)._generate(
+            messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        key = self._flight_key("stream", messages, stop, kwargs)
+        # Os tokens de quem espera são repassados aos callbacks por BaseChatModel.stream
+        return llm_flight.stream(key, lambda: super(SingleFlightChatMixin, self)._stream(
+            messages, stop=stop, run_manager=run_manager, **kwargs))
+
+
+@functools.lru_cache(maxsize=None)
+def single_flight(model_cls: type) -> type:
+    """Subclasse de `model_cls` com single-flight (preservada por `model_copy`)"""
+    return type(f"SingleFlight{model_cls.__name__}", (SingleFlightChatMixin, model_cls), {})
+
+
+class SingleFlightEmbeddings:
+    """Compartilha embeddings de consultas idênticas simultâneas
+
+    Só `embed_query` é agrupado: `embed_documents` já deduplica em lote. Os
+    demais atributos (ex.: `stats` do `EmbeddingService`) são do modelo original.
+    Segue a interface `Embeddings` do LangChain sem herdar dela, para não
+    importar o LangChain junto com este módulo.
+    """
+
+    def __init__(self, embeddings, flight: SingleFlight = embedding_flight):
+        self.embeddings = embeddings
+        self.flight = flight
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = request_key(id(self.embeddings), normalize_text(text))
+        return self.flight.do(key, lambda: self.embeddings.embed_query(text))
+
+    def __getattr__(self, name: str):
+        return getattr(self.__dict__["embeddings"], name)
+
+
+def coalesce_embeddings(embeddings):
+    return SingleFlightEmbeddings(embeddings) if single_flight_enabled() else embeddings
 
-load_dotenv()
 
 def load_llm():
-    return ChatGoogleGenerativeAI(
+    """Gemini por padrão; LLM_PROVIDER=fake usa um modelo local determinístico (testes de carga)
+
+    Com SINGLE_FLIGHT=true (padrão) gerações idênticas simultâneas são feitas uma única vez.
+    """
+    if os.getenv("LLM_PROVIDER", "gemini") == "fake":
+        from src.utils.fake_llm import FakeChatModel
+        model_cls = single_flight(FakeChatModel) if single_flight_enabled() else FakeChatModel
+
+        return model_cls(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", 0)),
+            token_latency=float(os.getenv("FAKE_LLM_TOKEN_LATENCY", 0))
+        )
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    model_cls = single_flight(ChatGoogleGenerativeAI) if single_flight_enabled() else ChatGoogleGenerativeAI
+
+    return model_cls(
         model="gemini-1.5-flash",
         temperature=0.3,
         api_key=os.getenv("GOOGLE_API_KEY")
     )
 
 def load_embeddings():
-    return GoogleGenerativeAIEmbeddings(
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return coalesce_embeddings(GoogleGenerativeAIEmbeddings(
         model="models/embedding-001",
         api_key=os.getenv("GOOGLE_API_KEY")
-    )
\ No newline at end of file
+    ))
@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import ContextDecorator
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple, Optional
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Atributos padrão de LogRecord; o resto veio de `extra=` e entra no JSON
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por evento, com os campos passados em `extra=`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update({k: v for k, v in vars(record).items() if k not in _RESERVED})
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+_handler: Optional[logging.Handler] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """(Re)configura o logger raiz `src`
+
+    LOG_FORMAT=json (padrão) ou text; LOG_LEVEL=INFO (padrão), DEBUG inclui cada medição.
+    Chame de novo depois de `load_dotenv()` para aplicar as variáveis do .env.
+    """
+    global _handler
+    with _configure_lock:
+        root = logging.getLogger("src")
+        if _handler is not None:
+            root.removeHandler(_handler)
+        _handler = logging.StreamHandler()
+        if (fmt or os.getenv("LOG_FORMAT", "json")) == "json":
+            _handler.setFormatter(JsonFormatter())
+        else:
+            _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        root.addHandler(_handler)
+        root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+        root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger do projeto; configura o logger raiz `src` na primeira chamada"""
+    if _handler is None:
+        configure_logging()
+    return logging.getLogger(name)
+
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, object]) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Summary:
+    """Contagem, soma e quantis sobre uma janela das últimas observações"""
+
+    def __init__(self, window: int = 2048):
+        self.count = 0
+        self.sum = 0.0
+        self._samples = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self._samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MetricsRegistry:
+    """Contadores e latências (p50/p95/p99) exportáveis no formato do Prometheus"""
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._counters: Dict[LabelKey, float] = {}
+        self._summaries: Dict[LabelKey, Summary] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = Summary(self.window)
+            summary.observe(value)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """{métrica: {rótulos: valores}} para relatórios e benchmarks"""
+        result: Dict[str, Dict[str, Dict[str, float]]] = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                result.setdefault(name, {})[_format_labels(labels)] = {"value": value}
+            for (name, labels), summary in self._summaries.items():
+                stats = {"count": summary.count, "sum": summary.sum}
+                stats.update({f"p{int(q * 100)}": summary.quantile(q) for q in QUANTILES})
+                result.setdefault(name, {})[_format_labels(labels)] = stats
+        return result
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (summaries com quantis)"""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self._summaries}):
+                lines.append(f"# TYPE {name} summary")
+                for (metric, labels), summary in sorted(self._summaries.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    for q in QUANTILES:
+                        quantile_labels = labels + (("quantile", str(q)),)
+                        lines.append(f"{name}{_format_labels(quantile_labels)} {summary.quantile(q)}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {summary.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {summary.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{k}="{v}"'.replace("\n", " ") for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+metrics = MetricsRegistry()
+
+
+class timed(ContextDecorator):
+    """Mede a duração de um bloco ou função e registra em `metrics`
+
+        with timed("chroma_query_seconds", mode="hybrid"):
+            ...
+
+        @timed("embedding_batch_seconds")
+        def encode(...): ...
+
+    A duração fica em `.elapsed`; em LOG_LEVEL=DEBUG cada medição vira um log JSON.
+    """
+
+    def __init__(self, name: str, registry: Optional[MetricsRegistry] = None, **labels):
+        self.name = name
+        self.registry = registry or metrics
+        self.labels = labels
+        self.elapsed = 0.0
+        self._start = 0.0
+
+    def _recreate_cm(self):
+        # Cada chamada da função decorada mede com uma instância própria (thread-safe)
+        return timed(self.name, self.registry, **self.labels)
+
+    def __enter__(self) -> "timed":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.elapsed = time.perf_counter() - self._start
+        labels = dict(self.labels, status="error") if exc_type else self.labels
+        self.registry.observe(self.name, self.elapsed, **labels)
+        # Obtido a cada medição: importar este módulo não configura o logging
+        timing_logger = logging.getLogger("src.timing")
+        if timing_logger.isEnabledFor(logging.DEBUG):
+            timing_logger.debug(self.name, extra={"metric": self.name, "seconds": round(self.elapsed, 6), **labels})
+        return False
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = metrics
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0",
+                         registry: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """Expõe GET /metrics em uma thread daemon"""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    get_logger(__name__).info("metrics server started", extra={"port": server.server_address[1]})
+    return server
@@ -0,0 +1,87 @@
+from typing import List, Tuple, Optional
+from src.utils.text_processor import estimate_tokens
+
+SUMMARY_PROMPT = """Atualize o resumo da conversa incorporando as novas trocas.
+Mantenha nomes, números, prazos e decisões; seja conciso.
+
+Resumo atual:
+{summary}
+
+Novas trocas:
+{turns}
+
+Resumo atualizado:"""
+
+SUMMARY_TURN_LABEL = "Resumo da conversa até aqui"
+
+Turn = Tuple[str, str]
+
+
+def turn_tokens(turn: Turn) -> int:
+    return estimate_tokens(turn[0]) + estimate_tokens(turn[1])
+
+
+class SummaryWindowMemory:
+    """Memória com janela limitada por tokens e resumo incremental das trocas antigas
+
+    As trocas mais recentes que cabem em `max_tokens` são enviadas literalmente.
+    Quando as trocas ainda não resumidas passam de `max_tokens`, as mais antigas
+    são incorporadas ao resumo em lote até sobrarem `keep_ratio * max_tokens`,
+    de modo que o resumo é refeito a cada várias trocas, e não a cada pergunta.
+    """
+
+    def __init__(self, llm=None, max_tokens: int = 800, keep_ratio: float = 0.5):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.keep_ratio = keep_ratio
+
+    def _recent(self, turns: List[Turn], budget: int) -> List[Turn]:
+        recent: List[Turn] = []
+        for turn in reversed(turns):
+            tokens = turn_tokens(turn)
+            if tokens > budget:
+                break
+            recent.insert(0, turn)
+            budget -= tokens
+        return recent
+
+    def window(self, history: List[Turn], summarized: int = 0) -> List[Turn]:
+        """Trocas recentes enviadas literalmente; não chama o LLM"""
+        if self.max_tokens <= 0:
+            return list(history)
+        return self._recent(list(history[summarized:]), self.max_tokens)
+
+    def needs_compaction(self, history: List[Turn], summarized: int = 0) -> bool:
+        if self.max_tokens <= 0:
+            return False
+        return sum(turn_tokens(turn) for turn in history[summarized:]) > self.max_tokens
+
+    def compact(self, history: List[Turn], summary: str = "",
+                summarized: int = 0) -> Tuple[str, int]:
+        """Retorna (resumo, quantidade de trocas já resumidas)
+
+        Só chama o LLM quando as trocas pendentes estouram a janela; nesse caso
+        resume de uma vez todas as que ficam fora da margem `keep_ratio`.
+        """
+        if not self.needs_compaction(history, summarized):
+            return summary, summarized
+        pending = list(history[summarized:])
+        keep = self._recent(pending, int(self.max_tokens * self.keep_ratio))
+        overflow = pending[:len(pending) - len(keep)]
+        return self._summarize(summary, overflow), summarized + len(overflow)
+
+    def _summarize(self, summary: str, turns: List[Turn]) -> str:
+        text = "\n".join(f"Usuário: {q}\nAssistente: {a}" for q, a in turns)
+        if self.llm is None:
+            # Sem LLM: mantém apenas as perguntas como resumo extrativo
+            questions = "; ".join(q for q, _ in turns)
+            return f"{summary}; {questions}".strip("; ")
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(vazio)", turns=text)
+        return self.llm.invoke(prompt).content.strip()
+
+    @staticmethod
+    def with_summary(window: List[Turn], summary: Optional[str]) -> List[Turn]:
+        """Inclui o resumo como primeira troca do histórico enviado à cadeia"""
+        if not summary:
+            return list(window)
+        return [(SUMMARY_TURN_LABEL, summary)] + list(window)
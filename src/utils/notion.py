@@ -1,148 +1,71 @@
-import requests
 import time
+from dataclasses import replace
 from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
 import os
-from langchain_core.documents import Document
-from langchain.vectorstores import Chroma 
-from langchain.embeddings import HuggingFaceEmbeddings
+from src.notion.api_client import NotionAPIClient
+from src.notion.block_parser import NotionBlockParser
 
-load_dotenv()
+_client: Optional[NotionAPIClient] = None
 
-NOTION_TOKEN = os.getenv("NOTION_TOKEN")
-NOTION_VERSION = os.getenv("NOTION_VERSION")
-
-headers = {
-    "Authorization": f"Bearer {NOTION_TOKEN}",
-    "Notion-Version": NOTION_VERSION,
-    "Content-Type": "application/json"
-}
+def _get_client() -> NotionAPIClient:
+    """Cria o cliente na primeira chamada, lendo as credenciais do ambiente"""
+    global _client
+    if _client is None:
+        _client = NotionAPIClient(os.getenv("NOTION_TOKEN"), os.getenv("NOTION_VERSION"))
+    return _client
 
 def get_block_children(block_id: str, delay: float = 0.3) -> List[Dict[str, Any]]:
     """Obtém todos os blocos filhos de um bloco, recursivamente com tratamento melhorado"""
-    url = f"https://api.notion.com/v1/blocks/{block_id}/children?page_size=100"
-    
     all_blocks = []
-    next_cursor = None
-    
-    while True:
-        try:
-            params = {}
-            if next_cursor:
-                params["start_cursor"] = next_cursor
-                
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            for block in data.get("results", []):
-                all_blocks.append(block)
-                
-                # Processa filhos recursivamente se existirem
-                if block.get("has_children", False) and block["type"] not in ["child_page", "child_database"]:
-                    time.sleep(delay)
-                    child_blocks = get_block_children(block["id"], delay)
-                    all_blocks.extend(child_blocks)
-            
-            if not data.get("has_more", False):
-                break
-                
-            next_cursor = data.get("next_cursor")
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Erro ao buscar bloco {block_id}: {e}")
-            break
-    
+
+    for block in _get_client().get_block_children(block_id):
+        all_blocks.append(block)
+
+        # Processa filhos recursivamente se existirem
+        if block.get("has_children", False) and block["type"] not in ["child_page", "child_database"]:
+            time.sleep(delay)
+            all_blocks.extend(get_block_children(block["id"], delay))
+
     return all_blocks
 
+_parser = NotionBlockParser()
+
 def extract_text_from_rich_text(rich_text: List[Dict[str, Any]]) -> str:
     """Extrai texto formatado de rich_text com marcações especiais"""
-    text_parts = []
-    for text in rich_text:
-        content = text.get("plain_text", "")
-        annotations = text.get("annotations", {})
-        
-        # Adiciona marcações baseadas em anotações
-        if annotations.get("bold"):
-            content = f"**{content}**"
-        if annotations.get("italic"):
-            content = f"*{content}*"
-        if annotations.get("code"):
-            content = f"`{content}`"
-        
-        text_parts.append(content)
-    
-    return "".join(text_parts)
+    return _parser._extract_rich_text(rich_text)
 
 def extract_content_from_blocks(blocks: List[Dict[str, Any]]) -> str:
     """Extrai texto formatado dos blocos do Notion com metadados estruturados"""
-    content = []
-    
-    for block in blocks:
-        block_type = block["type"]
-        content_data = block.get(block_type, {})
-        
-        # Cabeçalhos
-        if block_type.startswith("heading_"):
-            level = int(block_type.split("_")[1])
-            prefix = "#" * level
-            text = extract_text_from_rich_text(content_data.get("rich_text", []))
-            content.append(f"{prefix} {text}")
-        
-        # Listas
-        elif block_type in ["bulleted_list_item", "numbered_list_item"]:
-            prefix = "-" if block_type == "bulleted_list_item" else "1."
-            text = extract_text_from_rich_text(content_data.get("rich_text", []))
-            content.append(f"{prefix} {text}")
-        
-        # Citações e callouts
-        elif block_type in ["quote", "callout"]:
-            text = extract_text_from_rich_text(content_data.get("rich_text", []))
-            icon = content_data.get("icon", {}).get("emoji", "") if block_type == "callout" else ">"
-            content.append(f"{icon} {text}")
-        
-        # Código
-        elif block_type == "code":
-            text = extract_text_from_rich_text(content_data.get("rich_text", []))
-            language = content_data.get("language", "")
-            content.append(f"```{language}\n{text}\n```")
-        
-        # Texto simples
-        elif "rich_text" in content_data:
-            text = extract_text_from_rich_text(content_data["rich_text"])
-            if text.strip():
-                content.append(text)
-        
-        # Adiciona separador entre blocos
-        if content and content[-1].strip():
-            content.append("\n")
-    
-    return "\n".join(content).strip()
+    return _parser.parse_blocks(blocks, separator="\n\n")
 
 def get_page_content_recursive(page_id: str, max_depth: int = 3, current_depth: int = 0) -> str:
-    """Obtém todo o conteúdo de uma página do Notion recursivamente"""
+    """Obtém todo o conteúdo de uma página do Notion recursivamente (subpáginas e bancos de dados)"""
+    from src.notion.recursive_fetcher import CHILD_PAGE_TYPES, child_ref
+    from src.notion.workspace import WorkspaceIngestor
+
     if current_depth >= max_depth:
         return ""
-    
-    blocks = get_block_children(page_id)
-    content = extract_content_from_blocks(blocks)
-    
-    # Processa páginas filhas
-    child_pages = [b for b in blocks if b["type"] == "child_page"]
-    for page in child_pages:
-        time.sleep(0.3)
-        child_content = get_page_content_recursive(page["id"], max_depth, current_depth + 1)
-        if child_content:
-            content += f"\n\n## {page.get('child_page', {}).get('title', 'Subpágina')}\n\n{child_content}"
-    
-    return content
+
+    def visit(ref):
+        blocks = get_block_children(ref["id"])
+        children = [child_ref(b) for b in blocks if b["type"] in CHILD_PAGE_TYPES]
+        return extract_content_from_blocks(blocks), children
+
+    ingestor = WorkspaceIngestor(_get_client(), fetcher=None, max_depth=max_depth - current_depth - 1)
+    parts = []
+    for ref, page_content in ingestor.crawl([page_id], visit):
+        if not ref["depth"]:
+            parts.append(page_content)
+        elif page_content:
+            parts.append(f"## {ref['title'] or 'Subpágina'}\n\n{page_content}")
+    return "\n\n".join(parts)
 
 def get_page_content(page_id: str) -> str:
     """Wrapper para compatibilidade com versão anterior"""
     return get_page_content_recursive(page_id)
 
 def setup_retriever(texts: List[str], metadata: Optional[List[Dict[str, Any]]] = None, 
-                   embedding_model: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"):
+                   embedding_model: Optional[str] = None, collection_name: Optional[str] = None):
     """
     Configura o ChromaDB retriever com tratamento melhorado
     
@@ -150,7 +73,14 @@ def setup_retriever(texts: List[str], metadata: Optional[List[Dict[str, Any]]] =
         texts: Lista de textos para indexar
         metadata: Lista de metadados correspondentes
         embedding_model: Modelo de embeddings
+        collection_name: Coleção do Chroma (padrão: CHROMA_COLLECTION)
     """
+    from langchain_core.documents import Document
+    from langchain.vectorstores import Chroma
+    from src.chroma.collections import HNSWParams
+    from src.chroma.retriever import ChromaRetriever
+    from src.utils.embeddings import get_embedding_service
+
     # Cria documentos LangChain
     if metadata is None:
         metadata = [{} for _ in texts]
@@ -160,20 +90,19 @@ def setup_retriever(texts: List[str], metadata: Optional[List[Dict[str, Any]]] =
         for text, meta in zip(texts, metadata)
     ]
     
-    # Configura embeddings
-    embeddings = HuggingFaceEmbeddings(
-        model_name=embedding_model,
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
+    # Embeddings compartilhados (modelo carregado uma vez, com cache em disco)
+    embeddings = get_embedding_service(embedding_model)
     
-    # Configura ChromaDB
+    # Configura ChromaDB na coleção do workspace
+    hnsw = replace(HNSWParams.from_env(), space="cosine")
+    chroma = ChromaRetriever(embedding_model, collection_name=collection_name, hnsw=hnsw)
     db = Chroma.from_documents(
         documents=documents,
         embedding=embeddings,
-        persist_directory="database/chroma",
+        client=chroma.client,
+        collection_name=chroma.collection_name,
         collection_metadata={
-            "hnsw:space": "cosine",
+            **hnsw.to_metadata(),
             "allow_updates": True
         }
     )
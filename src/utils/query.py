@@ -0,0 +1,55 @@
+import re
+from typing import List, Tuple, Optional
+from src.utils.text_processor import estimate_tokens, truncate_to_tokens
+
+# Pronomes e referências que indicam uma pergunta dependente da conversa
+REFERENCE_PATTERN = re.compile(
+    r"\b(el[ea]s?|del[ea]s?|nel[ea]s?|iss[oa]|ess[ea]s?|dess[ea]s?|ness[ea]s?|aquel[ea]s?|"
+    r"aquilo|disso|nisso|mesm[oa]s?|tamb[ée]m|anterior|acima|it|that|this|those|they)\b",
+    re.IGNORECASE,
+)
+# Perguntas elípticas: "e o prazo?", "e para comercial?"
+ELLIPSIS_PATTERN = re.compile(r"^\s*(e|mas|ent[ãa]o|and)\b", re.IGNORECASE)
+SHORT_QUESTION_TOKENS = 4
+
+
+def needs_context(question: str) -> bool:
+    """A pergunta depende do histórico? (pronomes, elipse ou pergunta muito curta)"""
+    return bool(
+        REFERENCE_PATTERN.search(question)
+        or ELLIPSIS_PATTERN.match(question)
+        or estimate_tokens(question) <= SHORT_QUESTION_TOKENS
+    )
+
+
+def rewrite_query(question: str, history: List[Tuple[str, str]], turns: int = 2) -> Optional[str]:
+    """Consulta de busca contextualizada sem chamar o LLM
+
+    Se a pergunta depende do histórico, retorna as últimas `turns` perguntas do
+    usuário seguidas da pergunta atual; caso contrário, None (use a pergunta crua).
+    """
+    if not history or not needs_context(question):
+        return None
+    previous = [q for q, _ in history[-turns:] if q]
+    return " ".join(previous + [question]) if previous else None
+
+
+def fit_to_budget(documents: List, max_tokens: int) -> List:
+    """Mantém os documentos na ordem de relevância até esgotar o orçamento de tokens
+
+    O primeiro documento sempre entra (truncado se sozinho excede o orçamento).
+    """
+    if max_tokens <= 0:
+        return list(documents)
+    selected, used = [], 0
+    for document in documents:
+        tokens = estimate_tokens(document.page_content)
+        if used + tokens > max_tokens:
+            if not selected:
+                # Mesmo estimador da verificação: o trecho truncado cabe no orçamento
+                content = truncate_to_tokens(document.page_content, max_tokens)
+                selected.append(type(document)(page_content=content, metadata=document.metadata))
+            break
+        selected.append(document)
+        used += tokens
+    return selected
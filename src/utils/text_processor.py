@@ -0,0 +1,173 @@
+import re
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, TYPE_CHECKING
+
+# Document é importado só ao gerar chunks: importar o módulo não carrega o LangChain
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*)$")
+LIST_PATTERN = re.compile(r"^\s*(?:[-*]|\d+\.)\s+")
+
+# O modelo de embeddings padrão (paraphrase-multilingual-MiniLM-L12-v2) trunca a
+# entrada em max_seq_length=128 wordpieces; em português cada palavra vira ~1,3-1,5
+# wordpieces e o caminho de cabeçalhos também entra no chunk. Com 80 palavras o
+# chunk inteiro cabe no modelo: acima disso o final nunca seria embeddado.
+DEFAULT_CHUNK_TOKENS = 80
+DEFAULT_OVERLAP_TOKENS = 10
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata de tokens (palavras separadas por espaço)"""
+    return len(text.split())
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Maior prefixo (em palavras inteiras, com a formatação original) que cabe em
+    `max_tokens` segundo `estimate_tokens`"""
+    ends = [match.end() for match in re.finditer(r"\S+", text)]
+    low, high = 0, len(ends)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:ends[middle - 1]]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:ends[low - 1]] if low else ""
+
+
+class TextChunker:
+    """Divide o markdown gerado pelo parser respeitando a estrutura do documento
+
+    Cabeçalhos definem o caminho de seções (`heading_path`), blocos de código e
+    itens de lista nunca são quebrados no meio (a menos que excedam sozinhos o
+    orçamento) e os chunks consecutivos compartilham `overlap_tokens` de contexto.
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_CHUNK_TOKENS, overlap_tokens: int = DEFAULT_OVERLAP_TOKENS):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens deve ser menor que max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def _iter_units(self, text: str, heading_path: List[str]) -> Iterator[str]:
+        """Gera unidades estruturais (parágrafos, itens de lista, blocos de código)
+
+        Atualiza `heading_path` no lugar quando encontra um cabeçalho.
+        """
+        lines = iter(text.splitlines())
+        for line in lines:
+            stripped = line.strip()
+            if not stripped:
+                continue
+
+            if stripped.startswith("```"):
+                code = [line]
+                for code_line in lines:
+                    code.append(code_line)
+                    if code_line.strip().startswith("```"):
+                        break
+                yield "\n".join(code)
+                continue
+
+            heading = HEADING_PATTERN.match(stripped)
+            if heading:
+                level = len(heading.group(1))
+                del heading_path[level - 1:]
+                heading_path.extend([""] * (level - 1 - len(heading_path)))
+                heading_path.append(heading.group(2).strip())
+                continue
+
+            yield line
+
+    def _split_oversized(self, unit: str) -> Iterator[str]:
+        """Quebra por palavras uma unidade maior que o orçamento"""
+        words = unit.split()
+        step = self.max_tokens - self.overlap_tokens
+        for start in range(0, len(words), step):
+            yield " ".join(words[start:start + self.max_tokens])
+            if start + self.max_tokens >= len(words):
+                break
+
+    def _iter_chunks(self, text: str, heading_path: List[str]) -> Iterator[Tuple[str, str]]:
+        """Gera (texto, heading_path) respeitando o orçamento de tokens"""
+        buffer: List[str] = []
+        buffer_tokens = 0
+        buffer_path = " > ".join(p for p in heading_path if p)
+
+        def render(units: List[str], path: str) -> str:
+            body = "\n".join(units)
+            return f"{path}\n{body}" if path else body
+
+        for unit in self._iter_units(text, heading_path):
+            path = " > ".join(p for p in heading_path if p)
+            tokens = estimate_tokens(unit)
+
+            # Mudou de seção: fecha o chunk atual sem overlap
+            if buffer and path != buffer_path:
+                yield render(buffer, buffer_path), buffer_path
+                buffer, buffer_tokens = [], 0
+            buffer_path = path
+
+            if tokens > self.max_tokens:
+                if buffer:
+                    yield render(buffer, path), path
+                    buffer, buffer_tokens = [], 0
+                for piece in self._split_oversized(unit):
+                    yield render([piece], path), path
+                continue
+
+            if buffer and buffer_tokens + tokens > self.max_tokens:
+                yield render(buffer, path), path
+                # Mantém o final do chunk anterior como overlap
+                overlap: List[str] = []
+                overlap_tokens = 0
+                for previous in reversed(buffer):
+                    previous_tokens = estimate_tokens(previous)
+                    if overlap_tokens + previous_tokens > self.overlap_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_tokens += previous_tokens
+                buffer, buffer_tokens = overlap, overlap_tokens
+
+            buffer.append(unit)
+            buffer_tokens += tokens
+
+        if buffer:
+            yield render(buffer, buffer_path), buffer_path
+
+    def split_text(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> Iterator["Document"]:
+        """Divide um texto em Documents com metadados por chunk"""
+        from langchain_core.documents import Document
+
+        heading_path: List[str] = []
+        for index, (chunk, path) in enumerate(self._iter_chunks(text, heading_path)):
+            yield Document(
+                page_content=chunk,
+                metadata={**(metadata or {}), "heading_path": path, "chunk_index": index}
+            )
+
+    def split_sections(self, sections: Iterable[Dict[str, Any]],
+                       metadata: Optional[Dict[str, Any]] = None
+                       ) -> Iterator[Tuple[Dict[str, Any], List["Document"]]]:
+        """Divide as seções de uma página (um bloco de primeiro nível cada)
+
+        O caminho de cabeçalhos é mantido entre seções, mas nenhum chunk cruza
+        a fronteira de um bloco, para que a sincronização possa comparar blocos.
+        """
+        from langchain_core.documents import Document
+
+        heading_path: List[str] = []
+        for section in sections:
+            section_metadata = {
+                **(metadata or {}),
+                "block_id": section["block_id"],
+                "last_edited_time": section.get("last_edited_time") or "",
+            }
+            documents = [
+                Document(
+                    page_content=chunk,
+                    metadata={**section_metadata, "heading_path": path, "chunk_index": index}
+                )
+                for index, (chunk, path) in enumerate(self._iter_chunks(section["text"], heading_path))
+            ]
+            yield section, documents